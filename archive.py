@@ -0,0 +1,120 @@
+"""
+Compression για το archive tier του history (βλ. db.archive_history / db.compact_history).
+
+Κάθε πεδίο (review, reply, JSON) συμπιέζεται χωριστά με ένα κοινό dictionary
+εκπαιδευμένο πάνω σε παλιά rows: τα reviews είναι μικρά κείμενα που μοιάζουν
+πολύ μεταξύ τους, οπότε χωρίς dictionary ο compressor δεν έχει τι να "θυμηθεί".
+zstd όταν υπάρχει το προαιρετικό πακέτο `zstandard`, αλλιώς zlib με preset dictionary.
+
+    python archive.py --older-than 30          # archive rows > 30 ημερών
+    python archive.py --compact                # retrain + recompress + VACUUM
+    python archive.py --report
+"""
+import argparse
+import json
+import zlib
+from collections import Counter
+from typing import Iterable, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+ZSTD_LEVEL = 19  # το archive γράφεται σπάνια, διαβάζεται ακόμα πιο σπάνια
+ZLIB_LEVEL = 9
+ZSTD_DICT_SIZE = 64 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # max window του zlib
+TRAIN_SAMPLES = 2000
+
+
+def best_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _raw_dictionary(samples: List[str], size: int) -> bytes:
+    """Συχνά word n-grams (1..3), τα πιο "κερδοφόρα" στο τέλος (κοντινότερα στα δεδομένα)."""
+    counts: Counter = Counter()
+    for s in samples:
+        words = s.split()
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+    picked, total = [], 0
+    for gram, c in sorted(counts.items(), key=lambda kv: kv[1] * len(kv[0]), reverse=True):
+        if c < 2:
+            continue
+        b = (gram + " ").encode("utf-8")
+        if total + len(b) > size:
+            continue
+        picked.append(b)
+        total += len(b)
+    return b"".join(reversed(picked))
+
+
+def train_dictionary(samples: Iterable[str], codec: str) -> bytes:
+    samples = [s for s in samples if s][:TRAIN_SAMPLES * 4]
+    if codec == "zstd":
+        _require_zstd()
+        try:
+            return zstandard.train_dictionary(ZSTD_DICT_SIZE, [s.encode("utf-8") for s in samples]).as_bytes()
+        except zstandard.ZstdError:
+            # λίγα samples → το zdict training αποτυγχάνει· raw-content dictionary αντί γι' αυτό
+            return _raw_dictionary(samples, ZSTD_DICT_SIZE)
+    return _raw_dictionary(samples, ZLIB_DICT_SIZE)
+
+
+def _require_zstd() -> None:
+    if zstandard is None:
+        raise ImportError("This archive uses zstd; install the optional 'zstandard' package.")
+
+
+class TextCodec:
+    """compress/decompress str ↔ bytes με ένα dictionary. Όχι thread-safe (ένα instance ανά thread)."""
+
+    def __init__(self, codec: str, dictionary: bytes):
+        self.codec = codec
+        self.dictionary = dictionary
+        self._zc = self._zd = None
+        if codec == "zstd":
+            _require_zstd()
+            d = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._zc = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=d, write_content_size=True)
+            self._zd = zstandard.ZstdDecompressor(dict_data=d)
+        elif codec != "zlib":
+            raise ValueError(f"Unknown codec: {codec!r}")
+
+    def compress(self, text: Optional[str]) -> bytes:
+        data = (text or "").encode("utf-8")
+        if self._zc is not None:
+            return self._zc.compress(data)
+        c = zlib.compressobj(ZLIB_LEVEL, zdict=self.dictionary) if self.dictionary else zlib.compressobj(ZLIB_LEVEL)
+        return c.compress(data) + c.flush()
+
+    def decompress(self, blob: bytes) -> str:
+        if self._zd is not None:
+            return self._zd.decompress(blob).decode("utf-8")
+        d = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return (d.decompress(blob) + d.flush()).decode("utf-8")
+
+
+def main() -> None:
+    import db
+
+    ap = argparse.ArgumentParser(description="Archive old history rows into compressed storage.")
+    ap.add_argument("--older-than", type=int, default=None, help="archive rows older than N days")
+    ap.add_argument("--compact", action="store_true", help="retrain dictionary, recompress archive, VACUUM")
+    ap.add_argument("--report", action="store_true", help="print archive size report")
+    args = ap.parse_args()
+
+    db.init_db()
+    if args.older_than is not None:
+        print(json.dumps(db.archive_history(older_than_days=args.older_than)))
+    if args.compact:
+        print(json.dumps(db.compact_history()))
+    if args.report or (args.older_than is None and not args.compact):
+        print(json.dumps(db.archive_stats()))
+
+
+if __name__ == "__main__":
+    main()
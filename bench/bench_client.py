@@ -0,0 +1,94 @@
+"""
+Connection-setup κόστος ανά request: νέος OpenAI client σε κάθε request (όπως σε κάθε
+Streamlit rerun πριν το utils.shared_client) vs ένας shared client με keep-alive pool.
+
+    python bench/bench_client.py --requests 50
+    python bench/bench_client.py --tls-host api.openai.com   # + πραγματικό TCP/TLS handshake (network)
+
+Ο mock server είναι plain HTTP, οπότε η διαφορά εκεί είναι μόνο TCP connect + client
+construction· με --tls-host μετριέται και το handshake που γλιτώνει κάθε reused σύνδεση.
+"""
+import argparse
+import os
+import socket
+import ssl
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI  # noqa: E402
+
+import metrics  # noqa: E402
+import utils  # noqa: E402
+from mock_openai_server import MockConfig, start_server  # noqa: E402
+
+metrics.ENABLED = False  # κανένα span από το benchmark στο metrics table
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def one(client: OpenAI) -> None:
+    client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+
+
+def timed(fn, n: int):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def tls_handshake_ms(host: str, n: int):
+    ctx = ssl.create_default_context()
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        with socket.create_connection((host, 443), timeout=10) as sock:
+            with ctx.wrap_socket(sock, server_hostname=host):
+                pass
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def report(name: str, samples) -> float:
+    med = statistics.median(samples)
+    print(f"{name:28s} median {med:7.2f} ms   mean {statistics.mean(samples):7.2f} ms")
+    return med
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=50)
+    ap.add_argument("--tls-host", default=None, help="measure real TCP+TLS setup to this host (needs network)")
+    args = ap.parse_args()
+
+    server = start_server(MockConfig(latency_ms=0, jitter_ms=0, token_ms=0))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    def fresh() -> None:
+        # όπως πριν: OpenAI(...) σε κάθε rerun → νέο pool, νέα σύνδεση
+        client = OpenAI(base_url=base_url, api_key="mock", max_retries=0)
+        one(client)
+        client.close()
+
+    shared = utils.shared_client("mock", base_url)
+    one(shared)  # warm-up: η πρώτη σύνδεση ανοίγει μία φορά
+
+    new_ms = report("new client per request", timed(fresh, args.requests))
+    shared_ms = report("shared client (keep-alive)", timed(lambda: one(shared), args.requests))
+    print(f"{'saved per request':28s} {new_ms - shared_ms:7.2f} ms (local HTTP, no TLS)")
+
+    if args.tls_host:
+        tls = report(f"TCP+TLS setup {args.tls_host}", tls_handshake_ms(args.tls_host, max(5, args.requests // 5)))
+        print(f"{'saved per request (remote)':28s} ≈{tls + new_ms - shared_ms:7.2f} ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
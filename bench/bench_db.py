@@ -0,0 +1,99 @@
+"""
+Per-call latency των db.py functions: fresh connection ανά call (παλιό get_conn) vs pooled WAL connection.
+
+    python bench/bench_db.py --n 2000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import metrics  # noqa: E402
+
+metrics.ENABLED = False  # μετράμε το db, όχι το tracing· και κανένα span στο default DB_PATH
+
+ROW = {
+    "created_at": "2026-01-01T00:00:00+00:00", "property_name": "Villa", "platform": "Airbnb",
+    "tone": "Professional ⭐", "language": "English", "length": "Normal", "sentiment": "positive",
+    "issues_json": "[]", "summary": "Great stay.", "highlights_json": "[]",
+    "review": "Great stay, lovely host." * 10, "reply": "Thank you!" * 10,
+}
+
+
+def _fresh_conn():
+    # όπως το get_conn πριν το pooling: νέο connection, default pragmas
+    conn = sqlite3.connect(db.DB_PATH.as_posix(), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # τα FTS triggers του history καλούν το fold_text (βλ. db._connect)
+    conn.create_function("fold_text", 1, db._fold_text, deterministic=True)
+    return conn
+
+
+def old_kv_get(key: str):
+    conn = _fresh_conn()
+    row = conn.execute("SELECT v FROM kv WHERE k=?", (key,)).fetchone()
+    conn.close()
+    return row["v"] if row else None
+
+
+def old_list_properties():
+    conn = _fresh_conn()
+    rows = conn.execute("SELECT * FROM properties ORDER BY name COLLATE NOCASE").fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def old_add_history(row):
+    conn = _fresh_conn()
+    conn.execute("""
+        INSERT INTO history (
+            created_at, property_name, platform, tone, language, length,
+            sentiment, issues_json, summary, highlights_json, review, reply
+        ) VALUES (:created_at, :property_name, :platform, :tone, :language, :length,
+                  :sentiment, :issues_json, :summary, :highlights_json, :review, :reply)
+    """, row)
+    conn.commit()
+    conn.close()
+
+
+def per_call_us(fn, n: int, *args) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(*args)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        db.kv_set("model", "gpt-4o-mini")
+        for i in range(20):
+            db.upsert_property({"name": f"Property {i}"})
+
+        cases = [
+            ("kv_get", old_kv_get, db.kv_get, ("model",)),
+            ("list_properties", old_list_properties, db.list_properties, ()),
+            ("add_history", old_add_history, db.add_history, (ROW,)),
+        ]
+        print(f"{'operation':18s} {'fresh conn':>12s} {'pooled':>12s} {'speedup':>8s}")
+        for name, old, new, fn_args in cases:
+            n = args.n if name != "add_history" else max(args.n // 10, 1)
+            before = per_call_us(old, n, *fn_args)
+            after = per_call_us(new, n, *fn_args)
+            print(f"{name:18s} {before:10.1f}us {after:10.1f}us {before / after:7.1f}x")
+        db.close_conn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+End-to-end latency benchmark πάνω στο local mock server (χωρίς API key / κόστος).
+
+Pipeline ανά review: detect → analyze → prompt → generate → add_history,
+και μετά PDF export των αποθηκευμένων items. Αναφέρει p50/p95/p99 και throughput
+σε διάφορα concurrency levels.
+
+    python bench/bench_e2e.py --requests 40 --concurrency 1 4 16 --latency-ms 200 --error-rate 0.02
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI  # noqa: E402
+
+import db  # noqa: E402
+import metrics  # noqa: E402
+import pdf_report  # noqa: E402
+import scheduler  # noqa: E402
+import utils  # noqa: E402
+from mock_openai_server import MockConfig, start_server  # noqa: E402
+
+utils.LLM_CACHE_ENABLED = False  # κάθε request πρέπει να φτάνει στον server
+metrics.ENABLED = False  # κανένα span από το benchmark στο metrics table
+
+REVIEWS = [
+    "Great location, 5 minutes from the beach. The AC was a bit noisy at night but the host fixed it quickly.",
+    "Πολύ καθαρό διαμέρισμα, εξαιρετική τοποθεσία και πολύ φιλικός οικοδεσπότης!",
+    "The apartment was not as clean as the photos suggested and check-in took 40 minutes.",
+    "Die Wohnung war sehr sauber und die Lage ist perfekt. Vielen Dank für alles!",
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    s = sorted(samples)
+    k = (len(s) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def one_request(client: OpenAI, i: int, stream: bool) -> None:
+    review = REVIEWS[i % len(REVIEWS)]
+    result = utils.run_reply_pipeline(client, "gpt-4o-mini", review, "Airbnb", "Professional ⭐", "Normal")
+    if stream:
+        chunks = utils.generate_text_stream(client, "gpt-4o-mini", 0.6, result["prompt"], system=result["system"])
+        reply = "".join(chunks).strip()
+    else:
+        reply = utils.generate_text(client, "gpt-4o-mini", 0.6, result["prompt"], system=result["system"])
+    analysis = result["analysis"]
+    db.add_history({
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "property_name": "Bench Villa",
+        "platform": "Airbnb",
+        "tone": "Professional ⭐",
+        "language": result["language"],
+        "length": "Normal",
+        "sentiment": analysis.get("sentiment", "mixed"),
+        "issues_json": "[]",
+        "summary": analysis.get("summary", ""),
+        "highlights_json": "[]",
+        "review": f"{review} #{i}",
+        "reply": reply,
+    })
+
+
+def run_level(fn: Callable[[int], None], n: int, concurrency: int):
+    latencies, errors = [], 0
+
+    def timed(i: int) -> None:
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            fn(i)
+        except Exception:
+            errors += 1
+            return
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(n)))
+    wall = time.perf_counter() - t0
+    return latencies, errors, wall
+
+
+def report(name: str, concurrency: int, latencies: List[float], errors: int, wall: float) -> None:
+    if not latencies:
+        print(f"{name:10s} c={concurrency:<3d} all {errors} requests failed")
+        return
+    print(f"{name:10s} c={concurrency:<3d} n={len(latencies):<5d} err={errors:<3d} "
+          f"p50={percentile(latencies, 50):8.1f}ms p95={percentile(latencies, 95):8.1f}ms "
+          f"p99={percentile(latencies, 99):8.1f}ms mean={statistics.mean(latencies):8.1f}ms "
+          f"thr={len(latencies) / wall:7.1f}/s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=40, help="pipeline runs per concurrency level")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--latency-ms", type=float, default=200.0)
+    ap.add_argument("--jitter-ms", type=float, default=50.0)
+    ap.add_argument("--token-ms", type=float, default=2.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--stream", action="store_true", help="use generate_text_stream for the reply")
+    ap.add_argument("--pdfs", type=int, default=50, help="PDFs to render in the export benchmark")
+    args = ap.parse_args()
+
+    cfg = MockConfig(args.latency_ms, args.jitter_ms, args.token_ms, args.error_rate, retry_after_s=0.1)
+    server = start_server(cfg)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    client = OpenAI(base_url=base_url, api_key="mock", max_retries=0)
+    scheduler.configure(rpm=1_000_000, tpm=1_000_000_000, max_concurrency=max(args.concurrency) * 2,
+                        base_delay_s=0.05)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+
+        print(f"mock server {base_url} latency={args.latency_ms}±{args.jitter_ms}ms "
+              f"error_rate={args.error_rate} stream={args.stream}")
+        for c in args.concurrency:
+            before = cfg.requests
+            lat, err, wall = run_level(lambda i: one_request(client, i, args.stream), args.requests, c)
+            report("pipeline", c, lat, err, wall)
+            print(f"{'':10s} server requests: {cfg.requests - before}")
+
+        pdf_report.ensure_fonts()
+        items, _ = db.query_history(limit=args.pdfs)
+        for c in args.concurrency:
+            lat, err, wall = run_level(lambda i: pdf_report.make_pdf(items[i % len(items)]), args.pdfs, c)
+            report("pdf", c, lat, err, wall)
+        db.close_conn()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
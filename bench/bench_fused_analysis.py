@@ -0,0 +1,110 @@
+"""
+Timing comparison: fused analysis (1 call) vs LLM language detection + analyze_review + generate_text
+(3 calls), plus the current default of a local detector + analyze_review + generate_text (2 calls).
+
+    OPENAI_API_KEY=... python bench/bench_fused_analysis.py --runs 5
+    python bench/bench_fused_analysis.py --simulate-ms 700      # χωρίς API key, simulated latency
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+import utils  # noqa: E402
+
+utils.LLM_CACHE_ENABLED = False  # κάθε run πρέπει να χτυπάει το (simulated) API
+metrics.ENABLED = False  # αλλιώς τα simulated spans γράφονται στο metrics table του default DB_PATH
+
+REVIEW = (
+    "Great location, 5 minutes from the beach and the host was very responsive. "
+    "However the AC in the bedroom was noisy and the bathroom could have been cleaner. "
+    "Το πρωινό ήταν υπέροχο!"
+)
+
+
+class _SimulatedClient:
+    """Minimal stand-in for OpenAI(): sleeps per call to emulate one network round-trip."""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        if kwargs.get("response_format"):
+            content = json.dumps({
+                "language": "Mixed", "summary": "Good stay, noisy AC.", "sentiment": "mixed",
+                "issues": [{"label": "noise", "severity": 3, "note": "AC"}], "highlights": ["location"],
+            })
+        else:
+            content = "Thank you for your stay!"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def three_call_path(client, model: str) -> None:
+    # το LLM detector όπως πριν το lang_detect (το utils.detect_language απαντάει πλέον local)
+    utils.detect_language_llm(client, model, REVIEW)
+    analysis = utils.analyze_review(client, model, REVIEW)
+    prompt = utils.build_reply_prompt("Airbnb", "Professional ⭐", "English", "Normal", analysis, REVIEW)
+    utils.generate_text(client, model, 0.6, prompt["user"], system=prompt["system"])
+
+
+def local_detect_path(client, model: str) -> None:
+    utils.detect_language(client, model, REVIEW)
+    analysis = utils.analyze_review(client, model, REVIEW)
+    prompt = utils.build_reply_prompt("Airbnb", "Professional ⭐", "English", "Normal", analysis, REVIEW)
+    utils.generate_text(client, model, 0.6, prompt["user"], system=prompt["system"])
+
+
+def fused_path(client, model: str) -> None:
+    analysis = utils.analyze_review_fused(client, model, REVIEW)
+    prompt = utils.build_reply_prompt("Airbnb", "Professional ⭐", "English", "Normal", analysis, REVIEW)
+    utils.generate_text(client, model, 0.6, prompt["user"], system=prompt["system"])
+
+
+def measure(fn, client, model: str, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(client, model)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--simulate-ms", type=float, default=None,
+                    help="use a simulated client with this per-call latency instead of the real API")
+    args = ap.parse_args()
+
+    if args.simulate_ms is not None or not os.getenv("OPENAI_API_KEY"):
+        client = _SimulatedClient((args.simulate_ms or 700) / 1000.0)
+        mode = f"simulated {client.latency_s * 1000:.0f} ms/call"
+    else:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        mode = f"live API ({args.model})"
+
+    print(f"mode: {mode}, runs: {args.runs}")
+    for name, fn in (("3-call (LLM detect + analyze + generate)", three_call_path),
+                     ("local detect + analyze + generate", local_detect_path),
+                     ("fused  (analyze_fused + generate)", fused_path)):
+        calls = getattr(client, "calls", 0)
+        s = measure(fn, client, args.model, args.runs)
+        per_run = f"   {(client.calls - calls) / args.runs:.0f} calls/run" if hasattr(client, "calls") else ""
+        print(f"{name:42s} mean {statistics.mean(s) * 1000:8.1f} ms   "
+              f"median {statistics.median(s) * 1000:8.1f} ms{per_run}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Batch PDF export: serial make_pdf στο ίδιο process vs pdf_report.write_pdf_zip
+(process pool, fonts ανά worker, streamed ZIP) σε διάφορα worker counts.
+
+    python bench/bench_pdf_zip.py --items 300 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_report  # noqa: E402
+
+REVIEW = (
+    "Great location, 5 minutes from the beach. Πολύ καθαρό διαμέρισμα και ευγενικός οικοδεσπότης. "
+    "The AC was a bit noisy at night but the host fixed it quickly. "
+) * 12
+REPLY = "Thank you so much for staying with us and for your kind words! Σας ευχαριστούμε πολύ. " * 6
+
+
+def make_items(n: int):
+    for i in range(n):
+        yield {
+            "id": i + 1, "created_at": "2026-01-01T00:00:00+00:00", "property_name": "Bench Villa",
+            "platform": "Airbnb", "tone": "Professional ⭐", "language": "English", "length": "Normal",
+            "sentiment": "mixed", "summary": "Guest enjoyed the stay; AC was noisy.",
+            "issues_json": '[{"label": "noise", "severity": 3, "note": "AC noisy at night"}]',
+            "highlights_json": '["great location"]', "review": f"{REVIEW} #{i}", "reply": REPLY,
+        }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=300)
+    ap.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = ap.parse_args()
+
+    pdf_report.ensure_fonts()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "serial.zip")
+        t0 = time.perf_counter()
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+            for item in make_items(args.items):
+                zf.writestr(f"review_report_{item['id']}.pdf", pdf_report.make_pdf(item))
+        serial = time.perf_counter() - t0
+        print(f"serial      {args.items / serial:7.1f} PDFs/s  ({serial:.2f}s)")
+
+        for w in args.workers:
+            path = os.path.join(tmp, f"pool_{w}.zip")
+            stats = pdf_report.write_pdf_zip(path, make_items(args.items), max_workers=w)
+            with zipfile.ZipFile(path) as zf:
+                assert len(zf.namelist()) == args.items
+            print(f"workers={w:<3d} {args.items / stats['seconds']:7.1f} PDFs/s  ({stats['seconds']:.2f}s, "
+                  f"incl. pool start-up)  speedup {serial / stats['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+PDF line wrapping: το παλιό wrap_to_width (stringWidth όλης της γραμμής σε κάθε λέξη)
+vs text_wrap.wrap_to_width (glyph-width cache + incremental widths + binary search).
+
+    python bench/bench_wrap.py --kb 100 --repeat 3
+
+Κείμενο: ~100 KB review με ανάμικτα ελληνικά/λατινικά, μακριές παραγράφους
+και "λέξεις" χωρίς κενά (URLs) που πρέπει να σπάσουν.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfbase import pdfmetrics  # noqa: E402
+
+import pdf_report  # noqa: E402
+import text_wrap  # noqa: E402
+
+WORDS = (
+    "the apartment was clean and spacious with a great view of the sea host responded quickly "
+    "το διαμέρισμα ήταν πεντακάθαρο με υπέροχη θέα στη θάλασσα ο οικοδεσπότης ήταν ευγενικός "
+    "check-in Wi-Fi A/C μπαλκόνι κλιματισμός παραλία beach 5★ 👍 εξαιρετικό location"
+).split()
+
+
+def old_wrap_to_width(text: str, font_name: str, font_size: int, max_width: float) -> List[str]:
+    # όπως το pdf_report.wrap_to_width πριν το text_wrap
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    out_lines = []
+    for paragraph in text.split("\n"):
+        if not paragraph.strip():
+            out_lines.append("")
+            continue
+        words = paragraph.split()
+        cur = ""
+        for w in words:
+            test = (cur + " " + w).strip()
+            if pdfmetrics.stringWidth(test, font_name, font_size) <= max_width:
+                cur = test
+                continue
+            if cur:
+                out_lines.append(cur)
+            if pdfmetrics.stringWidth(w, font_name, font_size) > max_width:
+                chunk = ""
+                for ch in w:
+                    test2 = chunk + ch
+                    if pdfmetrics.stringWidth(test2, font_name, font_size) <= max_width:
+                        chunk = test2
+                    else:
+                        out_lines.append(chunk)
+                        chunk = ch
+                cur = chunk
+            else:
+                cur = w
+        if cur:
+            out_lines.append(cur)
+    return out_lines if out_lines else [""]
+
+
+def make_text(kb: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < kb * 1024:
+        r = rng.random()
+        if r < 0.01:
+            tok = "https://www.airbnb.com/rooms/" + "".join(rng.choice("abcdefαβγδε0123456789") for _ in range(400))
+        elif r < 0.03:
+            tok = "\n" if rng.random() < 0.5 else "\n\n"
+        else:
+            tok = rng.choice(WORDS)
+        parts.append(tok)
+        size += len(tok.encode("utf-8")) + 1
+    return " ".join(parts)
+
+
+def bench(fn, text: str, font: str, size: int, width: float, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text, font, size, width)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", type=int, default=100, help="text size in KB")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--width", type=float, default=515.0, help="line width in points (A4 minus margins)")
+    args = ap.parse_args()
+
+    pdf_report.ensure_fonts()
+    text = make_text(args.kb)
+    font, size = pdf_report.FONT_REGULAR_NAME, 10
+
+    old = old_wrap_to_width(text, font, size, args.width)
+    new = text_wrap.wrap_to_width(text, font, size, args.width)
+    print(f"text {len(text.encode('utf-8')) / 1024:.0f} KB, {len(new)} lines, identical output: {old == new}")
+
+    # και ένα τεράστιο paragraph χωρίς newlines: εκεί φαίνεται το quadratic κόστος ανά γραμμή
+    one_para = text.replace("\n", " ")
+    for name, t in (("mixed", text), ("one paragraph", one_para)):
+        text_wrap._widths.clear()
+        t_cold = bench(text_wrap.wrap_to_width, t, font, size, args.width, 1)
+        t_old = bench(old_wrap_to_width, t, font, size, args.width, args.repeat)
+        t_new = bench(text_wrap.wrap_to_width, t, font, size, args.width, args.repeat)
+        print(f"{name:14s} old {t_old:8.1f} ms   new {t_new:7.1f} ms (cold cache {t_cold:.1f} ms)   "
+              f"speedup {t_old / t_new:5.1f}x")
+
+    # ίδια breaks και σε στενές στήλες (πολλά hard splits)
+    for width in (60.0, 150.0, 300.0):
+        same = old_wrap_to_width(text, font, size, width) == text_wrap.wrap_to_width(text, font, size, width)
+        print(f"width {width:5.0f}pt identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
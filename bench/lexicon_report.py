@@ -0,0 +1,125 @@
+"""
+Confusion-matrix report: local lexicon classifier vs τα αποθηκευμένα (LLM) analyses του history.
+
+    python bench/lexicon_report.py --db host_reply_pro.db --limit 5000
+
+Rows που τα έγραψε το ίδιο το fast path (lexicon.produced_locally) παραλείπονται, αλλιώς
+το lexicon θα βαθμολογούσε τον εαυτό του. Στο τέλος τρέχουν και σταθερά probes με
+παράπονα χωρίς λέξεις του lexicon, που δεν πρέπει ποτέ να πάρουν το fast path.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import lexicon  # noqa: E402
+import metrics  # noqa: E402
+from utils import ISSUE_LABELS, local_analysis  # noqa: E402
+
+metrics.ENABLED = False  # read-only report: κανένα span στο metrics table της DB που διαβάζει
+
+SENTIMENTS = ["positive", "mixed", "negative"]
+
+# (review, αναμενόμενο sentiment): παράπονα που το lexicon βλέπει μόνο ως άρνηση ...
+PROBES = [
+    ("Great host. The AC didn't work.", "mixed"),
+    ("Lovely stay. No hot water for two days.", "mixed"),
+    ("Amazing view, wifi never worked", "mixed"),
+    ("Beautiful flat but the shower was cold every morning.", "mixed"),
+    ("Υπέροχο σπίτι. Δεν λειτουργούσε το κλιματιστικό.", "mixed"),
+    ("Τέλεια τοποθεσία, όμως δεν υπήρχε ζεστό νερό.", "mixed"),
+    # ... και παράπονα χωρίς άρνηση ή γνωστή αρνητική λέξη (πιάνονται από το MAX_UNKNOWN_SHARE)
+    ("Perfect location. The toilet was clogged on arrival.", "mixed"),
+    ("Lovely host, great communication. Sadly we got robbed.", "mixed"),
+    ("Wonderful stay! Only the wifi kept dropping.", "mixed"),
+    ("Great host, lovely place, would recommend. Tiny bathroom and thin walls.", "mixed"),
+    ("Υπέροχη θέα, αλλά το στρώμα βούλιαζε.", "mixed"),
+    # γλώσσα εκτός EN / EL: πάντα στο LLM
+    ("Appartement excellent, pas propre du tout", "mixed"),
+    ("Amazing place, spotless and the host was so friendly! Highly recommend.", "positive"),
+    ("Υπέροχο διαμέρισμα, πεντακάθαρο, ευγενικός οικοδεσπότης. Το συστήνω!", "positive"),
+]
+
+
+def print_matrix(title: str, pairs: Counter) -> None:
+    total = sum(pairs.values())
+    correct = sum(n for (truth, pred), n in pairs.items() if truth == pred)
+    print(f"\n{title}  (n={total}, accuracy={correct / total:.1%})" if total else f"\n{title}  (n=0)")
+    print(f"{'stored ↓ / local →':20s}" + "".join(f"{p:>10s}" for p in SENTIMENTS))
+    for truth in SENTIMENTS:
+        print(f"{truth:20s}" + "".join(f"{pairs[(truth, pred)]:10d}" for pred in SENTIMENTS))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=str(db.DB_PATH))
+    ap.add_argument("--limit", type=int, default=5000)
+    args = ap.parse_args()
+
+    db.DB_PATH = Path(args.db)
+    db.init_db()
+    rows, _ = db.query_history(limit=args.limit)
+    if not rows:
+        sys.exit("No history rows.")
+    llm_rows = [r for r in rows if not lexicon.produced_locally(r)]
+    skipped = len(rows) - len(llm_rows)
+    rows = llm_rows
+    if not rows:
+        sys.exit(f"No LLM-labelled history rows ({skipped} rows came from the lexicon fast path).")
+
+    all_pairs, fast_pairs = Counter(), Counter()
+    tp, fp, fn = Counter(), Counter(), Counter()
+    fast = 0
+    t0 = time.perf_counter()
+    for r in rows:
+        local = lexicon.classify(r["review"])
+        truth = r["sentiment"] if r["sentiment"] in SENTIMENTS else "mixed"
+        all_pairs[(truth, local["sentiment"])] += 1
+        if local_analysis(r["review"]) is not None:
+            fast += 1
+            fast_pairs[(truth, local["sentiment"])] += 1
+
+        stored = {i.get("label") for i in json.loads(r["issues_json"] or "[]") if isinstance(i, dict)}
+        predicted = {i["label"] for i in local["issues"]}
+        for label in predicted & stored:
+            tp[label] += 1
+        for label in predicted - stored:
+            fp[label] += 1
+        for label in stored - predicted:
+            fn[label] += 1
+    per_review_us = (time.perf_counter() - t0) / len(rows) * 1e6 / 2
+
+    print(f"{len(rows)} LLM-labelled reviews ({skipped} fast-path rows skipped), "
+          f"~{per_review_us:.0f} µs/review local classification")
+    print(f"fast path (LLM skipped): {fast} ({fast / len(rows):.1%})")
+    print_matrix("Sentiment — all reviews", all_pairs)
+    print_matrix("Sentiment — fast-path reviews only", fast_pairs)
+
+    print(f"\n{'issue label':16s}{'precision':>10s}{'recall':>10s}{'support':>10s}")
+    for label in ISSUE_LABELS:
+        support = tp[label] + fn[label]
+        if not support and not fp[label]:
+            continue
+        precision = tp[label] / (tp[label] + fp[label]) if tp[label] + fp[label] else 0.0
+        recall = tp[label] / support if support else 0.0
+        print(f"{label:16s}{precision:10.2f}{recall:10.2f}{support:10d}")
+
+    probe_pairs = Counter()
+    leaks = []
+    for text, truth in PROBES:
+        probe_pairs[(truth, lexicon.classify(text)["sentiment"])] += 1
+        if truth != "positive" and local_analysis(text) is not None:
+            leaks.append(text)
+    print_matrix("Sentiment — probes", probe_pairs)
+    print(f"complaint probes on the fast path: {len(leaks)}" + "".join(f"\n  {t}" for t in leaks))
+    db.close_conn()
+
+
+if __name__ == "__main__":
+    main()
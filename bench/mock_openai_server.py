@@ -0,0 +1,182 @@
+"""
+Local stand-in για το OpenAI chat-completions endpoint (χωρίς API key / κόστος).
+
+    python bench/mock_openai_server.py --port 8765 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+
+και μετά OpenAI(base_url="http://127.0.0.1:8765/v1", api_key="mock").
+
+Υποστηρίζει response_format={"type": "json_object"}, stream=True (SSE), n>1,
+usage (με cached_tokens), latency/jitter, per-token delay και error injection
+(429 με Retry-After, 500).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+ANALYSIS = {
+    "language": "English",
+    "summary": "Guest enjoyed the stay; AC was noisy at night.",
+    "sentiment": "mixed",
+    "issues": [{"label": "noise", "severity": 3, "note": "AC noisy at night"}],
+    "highlights": ["great location", "responsive host"],
+}
+
+REPLY = (
+    "Thank you so much for staying with us and for your kind words about the location. "
+    "We're sorry the air conditioning was noisy at night; we have already scheduled a service. "
+    "We hope to welcome you back soon!"
+)
+
+
+class MockConfig:
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 100.0, token_ms: float = 5.0,
+                 error_rate: float = 0.0, rate_limit_share: float = 0.5, retry_after_s: float = 0.2):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.rate_limit_share = rate_limit_share
+        self.retry_after_s = retry_after_s
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def _usage(body: Dict[str, Any], completion: str, n: int) -> Dict[str, Any]:
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4 + 1
+    completion_tokens = (len(completion) // 4 + 1) * n
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        # όπως το provider prefix cache: ακέραια blocks των 128 μετά τα πρώτα 1024
+        "prompt_tokens_details": {"cached_tokens": (prompt_tokens // 128) * 128 if prompt_tokens >= 1024 else 0},
+    }
+
+
+def make_handler(cfg: MockConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers και body γράφονται χωριστά· χωρίς αυτό Nagle + delayed ACK δίνουν ~40 ms ανά keep-alive request
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            with cfg.lock:
+                cfg.requests += 1
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            time.sleep(max(0.0, random.gauss(cfg.latency_ms, cfg.jitter_ms)) / 1000)
+
+            if random.random() < cfg.error_rate:
+                if random.random() < cfg.rate_limit_share:
+                    self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                                    {"retry-after": str(cfg.retry_after_s)})
+                else:
+                    self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+                return
+
+            json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+            content = json.dumps(ANALYSIS) if json_mode else REPLY
+            n = int(body.get("n") or 1)
+            rid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            created = int(time.time())
+            model = body.get("model", "mock")
+
+            if body.get("stream"):
+                self._stream(rid, created, model, content, n, body)
+                return
+
+            self._send_json(200, {
+                "id": rid,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                    for i in range(n)
+                ],
+                "usage": _usage(body, content, n),
+            })
+
+        def _stream(self, rid: str, created: int, model: str, content: str, n: int, body: Dict[str, Any]) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def event(payload: Dict[str, Any]) -> None:
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            base = {"id": rid, "object": "chat.completion.chunk", "created": created, "model": model}
+            words = content.split(" ")
+            for w_i, word in enumerate(words):
+                piece = word if w_i == 0 else " " + word
+                for i in range(n):
+                    event({**base, "choices": [{"index": i, "delta": {"content": piece}, "finish_reason": None}]})
+                time.sleep(cfg.token_ms / 1000)
+            for i in range(n):
+                event({**base, "choices": [{"index": i, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event({**base, "choices": [], "usage": _usage(body, content, n)})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def start_server(cfg: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Starts the server on a daemon thread; port=0 picks a free port (server.server_address[1])."""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=300.0)
+    ap.add_argument("--jitter-ms", type=float, default=100.0)
+    ap.add_argument("--token-ms", type=float, default=5.0, help="delay between streamed chunks")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--retry-after-s", type=float, default=0.2)
+    args = ap.parse_args()
+
+    cfg = MockConfig(args.latency_ms, args.jitter_ms, args.token_ms, args.error_rate, retry_after_s=args.retry_after_s)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    print(f"Mock OpenAI listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Headless bulk review processing (χωρίς Streamlit).
+
+    OPENAI_API_KEY=... python bulk.py reviews.csv --property "Villa Sunset" --concurrency 8
+
+Input: CSV (με header) ή JSONL. Στήλη/πεδίο "review" (ή "text" / "comments"),
+προαιρετικά "property_name", "platform", "created_at", "language".
+Τα αποτελέσματα γράφονται στο history σε batched transactions. Το run είναι
+resumable: reviews που υπάρχουν ήδη στο history (ίδιο content hash) παραλείπονται,
+όπως και επαναλήψεις του ίδιου review μέσα στο input.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator
+
+from openai import OpenAI
+
+import db
+import metrics
+import scheduler
+from utils import generate_text, run_reply_pipeline, shared_client
+
+REVIEW_FIELDS = ("review", "text", "comments")
+
+
+def iter_reviews(path: str) -> Iterator[Dict[str, Any]]:
+    """Streams records one by one (constant memory)."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def review_text(rec: Dict[str, Any]) -> str:
+    for field in REVIEW_FIELDS:
+        if rec.get(field):
+            return str(rec[field]).strip()
+    return ""
+
+
+def process_one(client: OpenAI, args: argparse.Namespace, rec: Dict[str, Any],
+                properties: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    text = review_text(rec)
+    property_name = rec.get("property_name") or args.property
+    platform = rec.get("platform") or args.platform
+
+    with metrics.context(property_name=property_name):
+        result = run_reply_pipeline(
+            client, args.model, text, platform, args.tone, args.length,
+            rec.get("language") or args.language, properties.get(property_name),
+        )
+        analysis = result["analysis"]
+        reply = generate_text(client, args.model, args.temperature, result["prompt"], system=result["system"])
+
+    return {
+        "created_at": rec.get("created_at") or datetime.now(timezone.utc).isoformat(),
+        "property_name": property_name,
+        "platform": platform,
+        "tone": args.tone,
+        "language": result["language"],
+        "length": args.length,
+        "sentiment": analysis.get("sentiment", "mixed"),
+        "issues_json": json.dumps(analysis.get("issues", []), ensure_ascii=False),
+        "summary": analysis.get("summary", ""),
+        "highlights_json": json.dumps(analysis.get("highlights", []), ensure_ascii=False),
+        "review": text,
+        "reply": reply,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, int]:
+    client = shared_client(os.environ["OPENAI_API_KEY"])
+    scheduler.configure(rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency)
+    properties = {p["name"]: p for p in db.list_properties()}
+    stats = {"done": 0, "skipped": 0, "failed": 0}
+    batch = []
+    in_flight = {}
+    # content hashes in flight ή στο batch (όχι ακόμα στη DB): το ίδιο review δύο φορές στο input
+    # δεν πρέπει να περάσει δύο φορές από το LLM ούτε να γραφτεί διπλό. Μετά το flush το πιάνει
+    # το history_hash_exists, οπότε το set μένει μικρό.
+    pending = set()
+    batch_keys = []
+    t0 = time.perf_counter()
+
+    def collect(block: bool) -> None:
+        if not in_flight:
+            return
+        done, _ = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for fut in done:
+            line_no, key = in_flight.pop(fut)
+            try:
+                batch.append(fut.result())
+                batch_keys.append(key)
+                stats["done"] += 1
+            except Exception as e:  # ένα αποτυχημένο review δεν σταματά το run
+                pending.discard(key)  # ένα επόμενο ίδιο line το ξαναδοκιμάζει
+                stats["failed"] += 1
+                print(f"[line {line_no}] failed: {e}", file=sys.stderr)
+        if len(batch) >= args.batch_size:
+            flush()
+
+    def flush() -> None:
+        if batch:
+            db.add_history_many(batch)
+            batch.clear()
+            pending.difference_update(batch_keys)
+            batch_keys.clear()
+            rate = stats["done"] / max(time.perf_counter() - t0, 1e-9)
+            print(f"done={stats['done']} skipped={stats['skipped']} failed={stats['failed']} "
+                  f"({rate:.1f} reviews/s)", file=sys.stderr)
+
+    # Bounded window: ποτέ περισσότερα από 2×concurrency reviews στη μνήμη
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for line_no, rec in enumerate(iter_reviews(args.input), start=1):
+            text = review_text(rec)
+            if not text:
+                stats["skipped"] += 1
+                continue
+            key = db.history_content_hash({
+                "property_name": rec.get("property_name") or args.property,
+                "platform": rec.get("platform") or args.platform,
+                "review": text,
+            })
+            if key in pending or db.history_hash_exists(key):
+                stats["skipped"] += 1
+                continue
+            pending.add(key)
+            while len(in_flight) >= 2 * args.concurrency:
+                collect(block=True)
+            in_flight[pool.submit(process_one, client, args, rec, properties)] = (line_no, key)
+            collect(block=False)
+        while in_flight:
+            collect(block=True)
+    flush()
+    return stats
+
+
+def main() -> None:
+    db.init_db()
+    settings = db.kv_snapshot()
+
+    ap = argparse.ArgumentParser(description="Bulk-generate host replies from a CSV/JSONL export.")
+    ap.add_argument("input", help="CSV (with header) or .jsonl file")
+    ap.add_argument("--property", default=settings.get("default_property", ""), help="default property name")
+    ap.add_argument("--platform", default=settings.get("default_platform", "Airbnb"))
+    ap.add_argument("--tone", default=settings.get("default_tone", "Professional ⭐"))
+    ap.add_argument("--length", default=settings.get("default_length", "Normal"),
+                    choices=["Short", "Normal", "Premium"])
+    ap.add_argument("--language", default="Auto (detect)", help='"Auto (detect)", "English" or "Greek"')
+    ap.add_argument("--model", default=settings.get("model", "gpt-4o-mini"))
+    ap.add_argument("--temperature", type=float, default=float(settings.get("temperature", "0.6")))
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rpm", type=float, default=scheduler.DEFAULT_RPM, help="account requests/min limit")
+    ap.add_argument("--tpm", type=float, default=scheduler.DEFAULT_TPM, help="account tokens/min limit")
+    ap.add_argument("--batch-size", type=int, default=50, help="history rows per transaction")
+    args = ap.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        sys.exit("Missing OPENAI_API_KEY environment variable.")
+
+    stats = run(args)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,172 +1,1727 @@
+import atexit
+import csv
+import hashlib
+import heapq
+import io
+import json
 import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import archive
+import dedup
+import metrics
 
 DB_PATH = Path("host_reply_pro.db")
 
+# LLM response cache (βλ. utils.call_json / utils.generate_text)
+LLM_CACHE_TTL_S = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 5000
+# hits / misses / last_used μένουν στη μνήμη και γράφονται ανά N lookups (και σε put / stats / exit)
+LLM_CACHE_FLUSH_LOOKUPS = 50
+
+
+# Near-duplicate signatures: πόσα παλιά rows συμπληρώνει κάθε init_db (~1 ms το καθένα, άρα
+# μικρό batch ανά rerun), πόσα ανά transaction το backfill_signatures(), και το kv key του
+# watermark (history ids ≤ αυτό έχουν ήδη signature)
+DEDUP_BACKFILL_INIT_BATCH = 50
+DEDUP_BACKFILL_BATCH = 2000
+DEDUP_BACKFILL_KEY = "_dedup_backfill_id"
+
+# Archive tier: rows παλαιότερα από N μέρες → history_archive (compressed)
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH = 500
+
+# Tracing (βλ. metrics.py): πόσες μέρες κρατάμε, και κάθε πότε (το πολύ) σβήνει τα παλιά ένα flush
+METRICS_RETENTION_DAYS = 90
+METRICS_PRUNE_INTERVAL_S = 3600
+
+# Connection tuning
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 8192
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+
+def _fold_text(text: Optional[str]) -> Optional[str]:
+    # lowercase + χωρίς τόνους (όπως lexicon.tokenize / dedup._normalize): το unicode61
+    # remove_diacritics βγάζει μόνο λατινικούς τόνους, όχι τον ελληνικό ("κλιματιστικό" ≠ "κλιματιστικο").
+    # NFD (όχι NFKD) ώστε να μην αλλάζουν τα όρια των tokens και τα snippets να δείχνουν σωστές λέξεις.
+    if text is None:
+        return None
+    text = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH.as_posix(), check_same_thread=False)
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+    # WAL: readers δεν μπλοκάρουν τον writer (και αντίστροφα)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+    # decompress archived text μέσα σε SQL (το FTS content view history_text)
+    codecs: Dict[int, archive.TextCodec] = {}
+
+    def archive_text(dict_id: int, blob: bytes) -> str:
+        if dict_id not in codecs:
+            codecs[dict_id] = _archive_codec(dict_id, conn)
+        return codecs[dict_id].decompress(blob)
+
+    conn.create_function("archive_text", 2, archive_text, deterministic=True)
+    conn.create_function("fold_text", 1, _fold_text, deterministic=True)
     return conn
 
 
+def get_conn() -> sqlite3.Connection:
+    """
+    One reused connection per thread (και per DB_PATH).
+    Writes go through `with conn:` so they commit or roll back atomically.
+    """
+    path = DB_PATH.as_posix()
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != path:
+        if conn is not None:
+            conn.close()
+        conn = _connect(path)
+        _local.conn = conn
+        _local.path = path
+    return conn
+
+
+def close_conn() -> None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@metrics.traced()
 def init_db():
     conn = get_conn()
-    cur = conn.cursor()
+    with conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS kv (
-        k TEXT PRIMARY KEY,
-        v TEXT NOT NULL
-    )
-    """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS kv (
+            k TEXT PRIMARY KEY,
+            v TEXT NOT NULL
+        )
+        """)
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS properties (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        description TEXT DEFAULT "",
-        location TEXT DEFAULT "",
-        checkin TEXT DEFAULT "",
-        checkout TEXT DEFAULT "",
-        house_rules TEXT DEFAULT "",
-        amenities TEXT DEFAULT ""
-    )
-    """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS properties (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            description TEXT DEFAULT "",
+            location TEXT DEFAULT "",
+            checkin TEXT DEFAULT "",
+            checkout TEXT DEFAULT "",
+            house_rules TEXT DEFAULT "",
+            amenities TEXT DEFAULT ""
+        )
+        """)
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT NOT NULL,
-        property_name TEXT DEFAULT "",
-        platform TEXT NOT NULL,
-        tone TEXT NOT NULL,
-        language TEXT NOT NULL,
-        length TEXT NOT NULL,
-        sentiment TEXT NOT NULL,
-        issues_json TEXT NOT NULL,
-        summary TEXT NOT NULL,
-        highlights_json TEXT NOT NULL,
-        review TEXT NOT NULL,
-        reply TEXT NOT NULL
-    )
-    """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            property_name TEXT DEFAULT "",
+            platform TEXT NOT NULL,
+            tone TEXT NOT NULL,
+            language TEXT NOT NULL,
+            length TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            issues_json TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            highlights_json TEXT NOT NULL,
+            review TEXT NOT NULL,
+            reply TEXT NOT NULL,
+            content_hash TEXT
+        )
+        """)
+
+        # migration: content_hash (dedup / resumable bulk runs)
+        cur.execute("PRAGMA table_info(history)")
+        if "content_hash" not in [r["name"] for r in cur.fetchall()]:
+            cur.execute("ALTER TABLE history ADD COLUMN content_hash TEXT")
+            cur.execute("SELECT id, property_name, platform, review FROM history")
+            cur.executemany("UPDATE history SET content_hash=? WHERE id=?", [
+                (history_content_hash(dict(r)), r["id"]) for r in cur.fetchall()
+            ])
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_content_hash ON history(content_hash)")
+
+        # Τα indexes ακολουθούν το ORDER BY created_at DESC, id DESC του query_history
+        # (το rowid είναι σιωπηρά η τελευταία στήλη κάθε index), ώστε να μη χρειάζεται temp B-tree sort.
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_property_created ON history(property_name, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_created ON history(created_at)")
+        cur.execute("DROP INDEX IF EXISTS idx_history_sentiment")
+        cur.execute("DROP INDEX IF EXISTS idx_history_platform")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_sentiment_created ON history(sentiment, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_platform_created ON history(platform, created_at)")
+
+        # Normalized issues (1 row ανά issue) για SQL-side analytics
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='history_issues'")
+        issues_exists = cur.fetchone() is not None
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_issues (
+            history_id INTEGER NOT NULL REFERENCES history(id) ON DELETE CASCADE,
+            label TEXT NOT NULL,
+            severity INTEGER NOT NULL,
+            note TEXT DEFAULT ""
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_issues_history ON history_issues(history_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_issues_label ON history_issues(label, severity)")
+        if not issues_exists:
+            # backfill από το issues_json των υπαρχόντων rows
+            cur.execute("SELECT id, issues_json FROM history")
+            for r in cur.fetchall():
+                _insert_issues(conn, r["id"], r["issues_json"])
+
+        # Near-duplicate detection: MinHash signature + LSH buckets ανά history row
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_minhash (
+            history_id INTEGER PRIMARY KEY REFERENCES history(id) ON DELETE CASCADE,
+            sig BLOB NOT NULL
+        )
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_lsh (
+            band INTEGER NOT NULL,
+            bucket TEXT NOT NULL,
+            history_id INTEGER NOT NULL REFERENCES history(id) ON DELETE CASCADE
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_lsh_bucket ON history_lsh(band, bucket)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_lsh_history ON history_lsh(history_id)")
+        # λίγα παλιά rows ανά rerun· τα υπόλοιπα με backfill_signatures() (Settings → Storage)
+        _backfill_signatures(conn, DEDUP_BACKFILL_INIT_BATCH)
+
+        # Archive tier: review/reply/JSON compressed με κοινό trained dictionary (βλ. archive.py)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archive_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS history_archive (
+            id INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            property_name TEXT DEFAULT "",
+            platform TEXT NOT NULL,
+            tone TEXT NOT NULL,
+            language TEXT NOT NULL,
+            length TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            content_hash TEXT,
+            dict_id INTEGER NOT NULL REFERENCES archive_dicts(id),
+            review_z BLOB NOT NULL,
+            reply_z BLOB NOT NULL,
+            issues_z BLOB NOT NULL,
+            highlights_z BLOB NOT NULL,
+            raw_bytes INTEGER NOT NULL
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_content_hash ON history_archive(content_hash)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_property_created "
+                    "ON history_archive(property_name, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_created ON history_archive(created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_sentiment_created "
+                    "ON history_archive(sentiment, created_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_platform_created "
+                    "ON history_archive(platform, created_at)")
+
+        # Full-text search (FTS5) πάνω σε hot + archived rows: external content = history_text view,
+        # synced με triggers. Το archive_history κρατάει τα entries των rows που μετακινεί.
+        cur.execute("""
+        CREATE VIEW IF NOT EXISTS history_text AS
+            SELECT id, review, reply, summary FROM history
+            UNION ALL
+            SELECT id, archive_text(dict_id, review_z), archive_text(dict_id, reply_z), summary FROM history_archive
+        """)
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='history_fts'")
+        fts = cur.fetchone()
+        fts_exists = fts is not None and "content='history_text'" in fts["sql"]
+        archive_relinked = fts is not None and not fts_exists
+        if archive_relinked:
+            # migration: παλιό FTS (content = history) έχανε τα archived rows
+            for name in ("history_fts_ai", "history_fts_ad", "history_fts_au"):
+                cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cur.execute("DROP TABLE history_fts")
+        # Το index κρατάει folded text (fold_text)· το view μένει αυτούσιο για τα snippets.
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name='history_fts_ai'")
+        trigger = cur.fetchone()
+        fts_folded = fts_exists and trigger is not None and "fold_text" in trigger["sql"]
+        if not fts_folded:
+            # migration: triggers που έγραφαν το κείμενο χωρίς folding
+            for name in ("history_fts_ai", "history_fts_ad", "history_fts_au"):
+                cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+            review, reply, summary,
+            content='history_text', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts(rowid, review, reply, summary)
+            VALUES (new.id, fold_text(new.review), fold_text(new.reply), fold_text(new.summary));
+        END
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON history
+        WHEN NOT EXISTS (SELECT 1 FROM history_archive WHERE id = old.id) BEGIN
+            INSERT INTO history_fts(history_fts, rowid, review, reply, summary)
+            VALUES ('delete', old.id, fold_text(old.review), fold_text(old.reply), fold_text(old.summary));
+        END
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE OF review, reply, summary ON history BEGIN
+            INSERT INTO history_fts(history_fts, rowid, review, reply, summary)
+            VALUES ('delete', old.id, fold_text(old.review), fold_text(old.reply), fold_text(old.summary));
+            INSERT INTO history_fts(rowid, review, reply, summary)
+            VALUES (new.id, fold_text(new.review), fold_text(new.reply), fold_text(new.summary));
+        END
+        """)
+        if not fts_folded:
+            # backfill για υπάρχοντα rows (και τα archived, μέσω του view)· όχι 'rebuild',
+            # γιατί αυτό θα διάβαζε το view χωρίς folding
+            cur.execute("INSERT INTO history_fts(history_fts) VALUES ('delete-all')")
+            cur.execute("""
+                INSERT INTO history_fts(rowid, review, reply, summary)
+                SELECT id, fold_text(review), fold_text(reply), fold_text(summary) FROM history_text
+            """)
 
-    conn.commit()
-    conn.close()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            k TEXT PRIMARY KEY,
+            v TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache_counters (
+            name TEXT PRIMARY KEY,
+            n INTEGER NOT NULL
+        )
+        """)
+        # migration: οι counters ήταν kv rows (και έμπαιναν στο kv_snapshot των settings)
+        cur.execute("SELECT k, v FROM kv WHERE k IN ('llm_cache_hits', 'llm_cache_misses')")
+        old_counters = [(r["k"][len("llm_cache_"):], int(r["v"])) for r in cur.fetchall()]
+        if old_counters:
+            _llm_cache_add_counters(cur, dict(old_counters))
+            cur.execute("DELETE FROM kv WHERE k IN ('llm_cache_hits', 'llm_cache_misses')")
 
+        # Tracing spans (LLM calls + db operations), γράφονται batched από το metrics.py
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS metrics (
+            ts REAL NOT NULL,
+            stage TEXT NOT NULL,
+            property_name TEXT DEFAULT "",
+            model TEXT DEFAULT "",
+            duration_ms REAL NOT NULL,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            cached_tokens INTEGER DEFAULT 0,
+            cache_hit INTEGER DEFAULT 0,
+            ok INTEGER DEFAULT 1
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_metrics_ts ON metrics(ts)")
 
+    if archive_relinked:
+        _relink_archived(conn)
+    if old_counters:
+        _bump_kv()
+
+
+@metrics.traced()
 def kv_get(key: str) -> Optional[str]:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT v FROM kv WHERE k=?", (key,))
     row = cur.fetchone()
-    conn.close()
     return row["v"] if row else None
 
 
 def kv_set(key: str, value: str) -> None:
+    kv_set_many({key: value})
+
+
+@metrics.traced()
+def kv_set_many(items: Dict[str, str]) -> None:
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO kv (k, v) VALUES (?, ?)
+            ON CONFLICT(k) DO UPDATE SET v=excluded.v
+        """, list(items.items()))
+    _bump_kv()
+
+
+# ---------------------------
+# Settings snapshot (in-process cache, invalidated by kv_set)
+# ---------------------------
+_kv_lock = threading.Lock()
+_kv_version = 0
+_kv_cache: Optional[Dict[str, str]] = None
+_kv_cache_key = None
+
+
+def _bump_kv() -> None:
+    global _kv_version
+    with _kv_lock:
+        _kv_version += 1
+
+
+@metrics.traced()
+def kv_snapshot() -> Dict[str, str]:
+    """
+    All kv rows in ONE query, cached in-process until the next kv_set / kv_set_many.
+    Returns a copy, so callers can't mutate the cache.
+    """
+    global _kv_cache, _kv_cache_key
+    with _kv_lock:
+        key = (DB_PATH.as_posix(), _kv_version)
+        if _kv_cache is not None and _kv_cache_key == key:
+            return dict(_kv_cache)
+
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO kv (k, v) VALUES (?, ?)
-        ON CONFLICT(k) DO UPDATE SET v=excluded.v
-    """, (key, value))
-    conn.commit()
-    conn.close()
+    cur.execute("SELECT k, v FROM kv")
+    data = {r["k"]: r["v"] for r in cur.fetchall()}
 
+    with _kv_lock:
+        # αν έγινε write στο μεταξύ, μην κάνεις cache ένα παλιό snapshot
+        if key == (DB_PATH.as_posix(), _kv_version):
+            _kv_cache, _kv_cache_key = data, key
+    return dict(data)
+
+
+@metrics.traced()
+def kv_get_many(keys: List[str]) -> Dict[str, Optional[str]]:
+    snap = kv_snapshot()
+    return {k: snap.get(k) for k in keys}
+
+
+# ---------------------------
+# Property cache (in-process, invalidated by upsert_property / delete_property)
+# ---------------------------
+_prop_lock = threading.Lock()
+_prop_version = 0
+_prop_cache: Optional[Dict[str, Dict[str, Any]]] = None
+_prop_cache_key = None
+
+
+def _bump_properties() -> None:
+    global _prop_version
+    with _prop_lock:
+        _prop_version += 1
+
+
+def properties_version() -> Tuple[str, int]:
+    """Version stamp των properties: αλλάζει σε κάθε upsert/delete (και ανά DB_PATH)."""
+    return DB_PATH.as_posix(), _prop_version
+
+
+def _property_map() -> Dict[str, Dict[str, Any]]:
+    # name → row, ταξινομημένα όπως πριν (name COLLATE NOCASE). Όχι copy: μόνο για εσωτερική χρήση.
+    global _prop_cache, _prop_cache_key
+    with _prop_lock:
+        key = properties_version()
+        if _prop_cache is not None and _prop_cache_key == key:
+            return _prop_cache
 
-def list_properties() -> List[Dict[str, Any]]:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT * FROM properties ORDER BY name COLLATE NOCASE")
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    data = {r["name"]: dict(r) for r in cur.fetchall()}
+
+    with _prop_lock:
+        if key == properties_version():
+            _prop_cache, _prop_cache_key = data, key
+    return data
 
 
+@metrics.traced()
+def list_properties() -> List[Dict[str, Any]]:
+    return [dict(p) for p in _property_map().values()]
+
+
+@metrics.traced()
+def property_names() -> List[str]:
+    return list(_property_map())
+
+
+@metrics.traced()
+def get_property(name: str) -> Optional[Dict[str, Any]]:
+    """One property profile by name from the in-process cache (no DB read after the first)."""
+    p = _property_map().get(name)
+    return dict(p) if p else None
+
+
+@metrics.traced()
 def upsert_property(data: Dict[str, Any]) -> None:
     conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO properties (name, description, location, checkin, checkout, house_rules, amenities)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                description=excluded.description,
+                location=excluded.location,
+                checkin=excluded.checkin,
+                checkout=excluded.checkout,
+                house_rules=excluded.house_rules,
+                amenities=excluded.amenities
+        """, (
+            data["name"],
+            data.get("description", ""),
+            data.get("location", ""),
+            data.get("checkin", ""),
+            data.get("checkout", ""),
+            data.get("house_rules", ""),
+            data.get("amenities", ""),
+        ))
+    _bump_properties()
+
+
+@metrics.traced()
+def delete_property(name: str) -> None:
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM properties WHERE name=?", (name,))
+    _bump_properties()
+
+
+def _issue_rows(history_id: int, issues_json: str) -> List[Tuple[int, str, int, str]]:
+    try:
+        issues = json.loads(issues_json or "[]")
+    except ValueError:
+        return []
+    out = []
+    for it in issues if isinstance(issues, list) else []:
+        if not isinstance(it, dict):
+            continue
+        try:
+            severity = int(it.get("severity", 3))
+        except (TypeError, ValueError):
+            severity = 3
+        out.append((history_id, str(it.get("label") or "other"), severity, str(it.get("note") or "")))
+    return out
+
+
+def _insert_issues(conn: sqlite3.Connection, history_id: int, issues_json: str) -> None:
+    conn.executemany(
+        "INSERT INTO history_issues (history_id, label, severity, note) VALUES (?, ?, ?, ?)",
+        _issue_rows(history_id, issues_json),
+    )
+
+
+def history_content_hash(row: Dict[str, Any]) -> str:
+    """Identity of a review for dedup: property + platform + review text."""
+    payload = "\x1f".join([row.get("property_name") or "", row.get("platform") or "", row.get("review") or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@metrics.traced()
+def history_hash_exists(content_hash: str) -> bool:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM history WHERE content_hash=? LIMIT 1", (content_hash,))
+    if cur.fetchone() is not None:
+        return True
+    cur.execute("SELECT 1 FROM history_archive WHERE content_hash=? LIMIT 1", (content_hash,))
+    return cur.fetchone() is not None
+
+
+def _insert_signature(conn: sqlite3.Connection, history_id: int, review: str) -> None:
+    sig = dedup.minhash(review)
+    conn.execute("INSERT OR REPLACE INTO history_minhash (history_id, sig) VALUES (?, ?)",
+                 (history_id, dedup.pack(sig)))
+    conn.executemany("INSERT INTO history_lsh (band, bucket, history_id) VALUES (?, ?, ?)",
+                     [(band, key, history_id) for band, key in enumerate(dedup.band_keys(sig))])
+
+
+def _backfill_signatures(conn: sqlite3.Connection, batch_size: int) -> int:
+    # μόνο πάνω από το watermark (kv): τα νέα rows παίρνουν signature στο insert,
+    # οπότε αυτό είναι ένα range scan λίγων rows, όχι anti-join όλου του history
     cur = conn.cursor()
+    cur.execute("SELECT v FROM kv WHERE k=?", (DEDUP_BACKFILL_KEY,))
+    r = cur.fetchone()
+    done_id = int(r["v"]) if r else 0
     cur.execute("""
-        INSERT INTO properties (name, description, location, checkin, checkout, house_rules, amenities)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(name) DO UPDATE SET
-            description=excluded.description,
-            location=excluded.location,
-            checkin=excluded.checkin,
-            checkout=excluded.checkout,
-            house_rules=excluded.house_rules,
-            amenities=excluded.amenities
-    """, (
-        data["name"],
-        data.get("description", ""),
-        data.get("location", ""),
-        data.get("checkin", ""),
-        data.get("checkout", ""),
-        data.get("house_rules", ""),
-        data.get("amenities", ""),
-    ))
-    conn.commit()
-    conn.close()
+        SELECT h.id, h.review FROM history h
+        LEFT JOIN history_minhash m ON m.history_id = h.id
+        WHERE h.id > ? AND m.history_id IS NULL
+        ORDER BY h.id
+        LIMIT ?
+    """, (done_id, batch_size))
+    missing = cur.fetchall()
+    for r in missing:
+        _insert_signature(conn, r["id"], r["review"])
+    if len(missing) == batch_size:
+        new_done_id = missing[-1]["id"]
+    else:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM history")
+        new_done_id = cur.fetchone()[0]
+    if new_done_id > done_id:
+        cur.execute("INSERT INTO kv (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v",
+                    (DEDUP_BACKFILL_KEY, str(new_done_id)))
+    return len(missing)
 
 
-def delete_property(name: str) -> None:
+@metrics.traced()
+def backfill_signatures(batch_size: int = DEDUP_BACKFILL_BATCH) -> int:
+    """
+    Near-duplicate signatures για όλα τα παλιά rows που δεν έχουν (π.χ. μετά από upgrade),
+    `batch_size` rows ανά transaction. Returns πόσα συμπληρώθηκαν.
+    """
+    conn = get_conn()
+    filled = 0
+    while True:
+        with conn:
+            n = _backfill_signatures(conn, batch_size)
+        filled += n
+        if n < batch_size:
+            return filled
+
+
+@metrics.traced()
+def find_near_duplicates(
+    review: str,
+    threshold: float = dedup.DEFAULT_THRESHOLD,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    History rows whose review is a near-duplicate of `review` (estimated Jaccard ≥ threshold),
+    best first. Each row gets a "similarity" field.
+    """
+    sig = dedup.minhash(review)
+    keys = dedup.band_keys(sig)
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("DELETE FROM properties WHERE name=?", (name,))
-    conn.commit()
-    conn.close()
+    cur.execute(
+        "SELECT DISTINCT l.history_id, m.sig FROM history_lsh l "
+        "JOIN history_minhash m ON m.history_id = l.history_id WHERE "
+        + " OR ".join(["(l.band = ? AND l.bucket = ?)"] * len(keys)),
+        [v for band, key in enumerate(keys) for v in (band, key)],
+    )
+    scored = []
+    for r in cur.fetchall():
+        sim = dedup.similarity(sig, dedup.unpack(r["sig"]))
+        if sim >= threshold:
+            scored.append((sim, r["history_id"]))
+    scored.sort(key=lambda t: (-t[0], -t[1]))
+
+    out = []
+    for sim, history_id in scored[:limit]:
+        item = get_history_item(history_id)
+        if item:
+            item["similarity"] = sim
+            out.append(item)
+    return out
 
 
 def add_history(row: Dict[str, Any]) -> None:
+    add_history_many([row])
+
+
+@metrics.traced()
+def add_history_many(rows: List[Dict[str, Any]]) -> None:
+    """Insert many history rows (+ their issues) in ONE transaction."""
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        for row in rows:
+            cur.execute("""
+                INSERT INTO history (
+                    created_at, property_name, platform, tone, language, length,
+                    sentiment, issues_json, summary, highlights_json, review, reply, content_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                row["created_at"],
+                row.get("property_name", ""),
+                row["platform"],
+                row["tone"],
+                row["language"],
+                row["length"],
+                row["sentiment"],
+                row["issues_json"],
+                row["summary"],
+                row["highlights_json"],
+                row["review"],
+                row["reply"],
+                row.get("content_hash") or history_content_hash(row),
+            ))
+            _insert_issues(conn, cur.lastrowid, row["issues_json"])
+            _insert_signature(conn, cur.lastrowid, row["review"])
+
+
+@metrics.traced()
+def list_history(limit: int = 50, include_archive: bool = False) -> List[Dict[str, Any]]:
+    return query_history(include_archive=include_archive, limit=limit)[0]
+
+
+@metrics.traced()
+def list_archived_history(limit: int = 50) -> List[Dict[str, Any]]:
+    """Τα πιο πρόσφατα archived rows (decompressed), π.χ. για επιλογή όταν το hot tier τα κρύβει."""
+    return _query_archive([], [], limit)
+
+
+# issue_label filter: από πόσα history_issues rows και πάνω το label θεωρείται "συχνό"
+ISSUE_EXISTS_MIN_ROWS = 2000
+
+
+def _history_filters(
+    property_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    platform: Optional[str] = None,
+    issue_label: Optional[str] = None,
+    issue_exists: bool = False,
+) -> Tuple[List[str], List[Any]]:
+    where, params = [], []
+    if property_name is not None:
+        where.append("property_name = ?")
+        params.append(property_name)
+    if date_from:
+        where.append("created_at >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("created_at < ?")
+        params.append(date_to)
+    if sentiment:
+        where.append("sentiment = ?")
+        params.append(sentiment)
+    if platform:
+        where.append("platform = ?")
+        params.append(platform)
+    if issue_label:
+        if issue_exists:
+            # correlated: το scan ακολουθεί το index του ORDER BY και σταματάει στο LIMIT
+            where.append("EXISTS (SELECT 1 FROM history_issues WHERE history_id = id AND label = ?)")
+        else:
+            where.append("id IN (SELECT history_id FROM history_issues WHERE label = ?)")
+        params.append(issue_label)
+    return where, params
+
+
+def _issue_label_is_common(cur: sqlite3.Cursor, label: str) -> bool:
+    # Σπάνιο label: το IN (λίγα ids + sort) είναι φθηνότερο. Συχνό: EXISTS πάνω στο created_at index.
+    cur.execute(
+        "SELECT COUNT(*) AS n FROM (SELECT 1 FROM history_issues WHERE label = ? LIMIT ?)",
+        (label, ISSUE_EXISTS_MIN_ROWS),
+    )
+    return cur.fetchone()["n"] >= ISSUE_EXISTS_MIN_ROWS
+
+
+_HISTORY_PAGE_ORDER = " ORDER BY created_at DESC, id DESC LIMIT ?"
+
+
+def _query_archive(where: List[str], params: List[Any], limit: int) -> List[Dict[str, Any]]:
+    cur = get_conn().cursor()
+    tail = (" WHERE " + " AND ".join(where) if where else "") + _HISTORY_PAGE_ORDER
+    cur.execute(f"SELECT * FROM history_archive{tail}", [*params, limit])
+    codecs: Dict[int, archive.TextCodec] = {}
+    items = []
+    for r in cur.fetchall():
+        if r["dict_id"] not in codecs:
+            codecs[r["dict_id"]] = _archive_codec(r["dict_id"])
+        items.append(_unarchive(r, codecs[r["dict_id"]]))
+    return items
+
+
+@metrics.traced()
+def query_history(
+    property_name: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    platform: Optional[str] = None,
+    issue_label: Optional[str] = None,
+    before: Optional[Tuple[str, int]] = None,
+    limit: int = 50,
+    include_archive: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """
+    Filtered history, newest first, keyset-paginated on (created_at, id) < before (όχι OFFSET).
+    date_from/date_to: ISO strings, compared to created_at (date_to is exclusive).
+    include_archive: merges in the decompressed archived rows (flagged "archived"), same order.
+    Returns (rows, next_cursor); next_cursor is a (created_at, id) pair, None on the last page.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    issue_exists = bool(issue_label) and _issue_label_is_common(cur, issue_label)
+    where, params = _history_filters(
+        property_name, date_from, date_to, sentiment, platform, issue_label, issue_exists
+    )
+    if before is not None:
+        where.append("(created_at, id) < (?, ?)")
+        params.extend(before)
+
+    tail = (" WHERE " + " AND ".join(where) if where else "") + _HISTORY_PAGE_ORDER
+    cur.execute(f"SELECT * FROM history{tail}", [*params, limit + 1])
+    rows = [dict(r) for r in cur.fetchall()]
+
+    if include_archive:
+        # τα archived rows είναι παλαιότερα: αν το hot γέμισε τη σελίδα, decompress μόνο όσα
+        # χωράνε πριν από το τελευταίο hot row (συνήθως κανένα)
+        awhere, aparams = list(where), list(params)
+        if len(rows) > limit:
+            awhere.append("(created_at, id) > (?, ?)")
+            aparams.extend((rows[-1]["created_at"], rows[-1]["id"]))
+        rows.extend(_query_archive(awhere, aparams, limit + 1))
+        rows.sort(key=lambda r: (r["created_at"], r["id"]), reverse=True)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = (last["created_at"], last["id"])
+    return rows[:limit], next_cursor
+
+
+@metrics.traced()
+def list_history_properties() -> List[str]:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("""
-        INSERT INTO history (
-            created_at, property_name, platform, tone, language, length,
-            sentiment, issues_json, summary, highlights_json, review, reply
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        row["created_at"],
-        row.get("property_name", ""),
-        row["platform"],
-        row["tone"],
-        row["language"],
-        row["length"],
-        row["sentiment"],
-        row["issues_json"],
-        row["summary"],
-        row["highlights_json"],
-        row["review"],
-        row["reply"],
-    ))
-    conn.commit()
-    conn.close()
-
-
-def list_history(limit: int = 50) -> List[Dict[str, Any]]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM history ORDER BY id DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        SELECT property_name FROM history UNION SELECT property_name FROM history_archive
+        ORDER BY property_name COLLATE NOCASE
+    """)
+    return [r["property_name"] for r in cur.fetchall()]
+
+
+def _fts_query(text: str) -> str:
+    # κάθε λέξη σαν quoted term (AND) ώστε η είσοδος του χρήστη να μη σπάει το FTS5 syntax
+    terms = [t.replace('"', '""') for t in _fold_text(text).split()]
+    return " ".join(f'"{t}"' for t in terms if t)
 
 
+SEARCH_MAX_CANDIDATES = 2000
+
+
+@metrics.traced()
+def search_history(query: str, limit: int = 20, max_candidates: int = SEARCH_MAX_CANDIDATES) -> List[Dict[str, Any]]:
+    """
+    Full-text search σε review / reply / summary (hot + archived rows), ranked με bm25 (καλύτερα πρώτα).
+    Snippets έχουν τα matches σε **bold** (markdown).
+
+    Για πολύ συχνούς όρους το bm25 ranking γίνεται μόνο στα `max_candidates`
+    πιο πρόσφατα matches, ώστε το latency να μένει σταθερό σε μεγάλο history.
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT rowid FROM history_fts WHERE history_fts MATCH ?
+        ORDER BY rowid DESC LIMIT 1 OFFSET ?
+    """, (match, max_candidates - 1))
+    row = cur.fetchone()
+    min_id = row["rowid"] if row else 0
+
+    cur.execute("""
+        SELECT history_fts.rowid AS id,
+               COALESCE(h.created_at, a.created_at) AS created_at,
+               COALESCE(h.property_name, a.property_name) AS property_name,
+               COALESCE(h.platform, a.platform) AS platform,
+               COALESCE(h.sentiment, a.sentiment) AS sentiment,
+               a.id IS NOT NULL AS archived,
+               bm25(history_fts) AS rank,
+               snippet(history_fts, 0, '**', '**', '…', 16) AS review_snippet,
+               snippet(history_fts, 1, '**', '**', '…', 16) AS reply_snippet
+        FROM history_fts
+        LEFT JOIN history h ON h.id = history_fts.rowid
+        LEFT JOIN history_archive a ON a.id = history_fts.rowid
+        WHERE history_fts MATCH ? AND history_fts.rowid >= ?
+        ORDER BY rank
+        LIMIT ?
+    """, (match, min_id, limit))
+    return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.traced()
 def get_history_item(item_id: int) -> Optional[Dict[str, Any]]:
+    """One history row by id· archived rows are decompressed transparently ("archived": True)."""
     conn = get_conn()
     cur = conn.cursor()
     cur.execute("SELECT * FROM history WHERE id=?", (item_id,))
     row = cur.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    if row:
+        return dict(row)
+    cur.execute("SELECT * FROM history_archive WHERE id=?", (item_id,))
+    row = cur.fetchone()
+    return _unarchive(row, _archive_codec(row["dict_id"])) if row else None
 
 
+@metrics.traced()
 def clear_history() -> None:
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM history")
+        cur.execute("DELETE FROM history_archive")
+        cur.execute("DELETE FROM archive_dicts")
+        # ό,τι έμεινε από archived rows (δεν έχουν parent για CASCADE / trigger)
+        cur.execute("DELETE FROM history_issues")
+        cur.execute("DELETE FROM history_minhash")
+        cur.execute("DELETE FROM history_lsh")
+        cur.execute("INSERT INTO history_fts(history_fts) VALUES ('delete-all')")
+    _archive_dicts.clear()
+
+
+# ---------------------------
+# Archive tier (compressed cold storage)
+# ---------------------------
+_ARCHIVE_COLUMNS = [
+    "id", "created_at", "property_name", "platform", "tone", "language", "length", "sentiment",
+    "summary", "content_hash", "dict_id", "review_z", "reply_z", "issues_z", "highlights_z", "raw_bytes",
+]
+# (db path, dict_id) → (codec, data)· τα dictionaries δεν αλλάζουν μόλις γραφτούν
+_archive_dicts: Dict[Tuple[str, int], Tuple[str, bytes]] = {}
+
+
+def _archive_codec(dict_id: int, conn: Optional[sqlite3.Connection] = None) -> archive.TextCodec:
+    key = (DB_PATH.as_posix(), dict_id)
+    if key not in _archive_dicts:
+        cur = (conn or get_conn()).cursor()
+        cur.execute("SELECT codec, data FROM archive_dicts WHERE id=?", (dict_id,))
+        r = cur.fetchone()
+        _archive_dicts[key] = (r["codec"], bytes(r["data"]))
+    return archive.TextCodec(*_archive_dicts[key])
+
+
+def _unarchive(row: sqlite3.Row, codec: archive.TextCodec) -> Dict[str, Any]:
+    item = {k: row[k] for k in HISTORY_COLUMNS if k in row.keys()}
+    item["review"] = codec.decompress(row["review_z"])
+    item["reply"] = codec.decompress(row["reply_z"])
+    item["issues_json"] = codec.decompress(row["issues_z"])
+    item["highlights_json"] = codec.decompress(row["highlights_z"])
+    item["archived"] = True
+    return item
+
+
+def _archive_params(item: Dict[str, Any], dict_id: int, codec: archive.TextCodec) -> Tuple:
+    texts = [item["review"], item["reply"], item["issues_json"], item["highlights_json"]]
+    blobs = [codec.compress(t) for t in texts]
+    raw = sum(len((t or "").encode("utf-8")) for t in texts)
+    return (
+        item["id"], item["created_at"], item.get("property_name") or "", item["platform"], item["tone"],
+        item["language"], item["length"], item["sentiment"], item["summary"], item.get("content_hash"),
+        dict_id, *blobs, raw,
+    )
+
+
+def _new_archive_dict(conn: sqlite3.Connection, samples: List[str]) -> int:
+    codec = archive.best_codec()
+    data = archive.train_dictionary(samples, codec)
+    with conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO archive_dicts (codec, data, created_at) VALUES (?, ?, ?)", (codec, data, time.time()))
+        return cur.lastrowid
+
+
+@contextmanager
+def _foreign_keys_off(conn: sqlite3.Connection) -> Iterator[None]:
+    # τα archived rows κρατάνε issues / signatures χωρίς parent στο history, οπότε χωρίς CASCADE.
+    # Το PRAGMA αλλάζει μόνο εκτός transaction.
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        yield
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+
+def _relink_archived(conn: sqlite3.Connection) -> None:
+    """Issues + signatures για archived rows που τα έχασαν (archive πριν κρατάει τα links του)."""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT * FROM history_archive a
+        WHERE NOT EXISTS (SELECT 1 FROM history_minhash m WHERE m.history_id = a.id)
+    """)
+    rows = cur.fetchall()
+    if not rows:
+        return
+    codecs: Dict[int, archive.TextCodec] = {}
+    with _foreign_keys_off(conn), conn:
+        for r in rows:
+            if r["dict_id"] not in codecs:
+                codecs[r["dict_id"]] = _archive_codec(r["dict_id"], conn)
+            item = _unarchive(r, codecs[r["dict_id"]])
+            conn.execute("DELETE FROM history_issues WHERE history_id=?", (r["id"],))
+            _insert_issues(conn, r["id"], item["issues_json"])
+            _insert_signature(conn, r["id"], item["review"])
+
+
+@metrics.traced()
+def archive_history(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH) -> Dict[str, Any]:
+    """
+    Moves history rows older than `older_than_days` into history_archive, compressed.
+    Only the text storage changes: issues (analytics), FTS entries (search), near-duplicate
+    signatures and content-hash dedup keep covering archived rows, and get_history_item,
+    list_archived_history and the include_archive=True reads (list/query/iter_history)
+    decompress them.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    conn = get_conn()
+    cur = conn.cursor()
+
+    # κοινό dictionary: το τελευταίο για τον τρέχοντα codec, αλλιώς train από τα rows που θα φύγουν
+    cur.execute("SELECT id FROM archive_dicts WHERE codec=? ORDER BY id DESC LIMIT 1", (archive.best_codec(),))
+    r = cur.fetchone()
+    if r:
+        dict_id = r["id"]
+    else:
+        cur.execute("SELECT 1 FROM history WHERE created_at < ? LIMIT 1", (cutoff,))
+        if cur.fetchone() is None:
+            return {"archived": 0, "raw_bytes": 0, "stored_bytes": 0}
+        cur.execute("""
+            SELECT review, reply, issues_json, highlights_json FROM history
+            WHERE created_at < ? ORDER BY id DESC LIMIT ?
+        """, (cutoff, archive.TRAIN_SAMPLES))
+        dict_id = _new_archive_dict(conn, [t for row in cur.fetchall() for t in row])
+    codec = _archive_codec(dict_id)
+
+    archived = raw_bytes = stored_bytes = 0
+    with _foreign_keys_off(conn):
+        while True:
+            with conn:
+                cur = conn.cursor()
+                cur.execute(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history WHERE created_at < ? ORDER BY id LIMIT ?",
+                            (cutoff, batch_size))
+                rows = [dict(x) for x in cur.fetchall()]
+                if not rows:
+                    break
+                params = [_archive_params(row, dict_id, codec) for row in rows]
+                cur.executemany(f"INSERT INTO history_archive ({', '.join(_ARCHIVE_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(_ARCHIVE_COLUMNS))})", params)
+                # issues / signatures μένουν (χωρίς CASCADE)· το FTS trigger αγνοεί rows που είναι στο archive
+                cur.executemany("DELETE FROM history WHERE id=?", [(row["id"],) for row in rows])
+            archived += len(rows)
+            raw_bytes += sum(p[-1] for p in params)
+            stored_bytes += sum(len(b) for p in params for b in p[11:15])
+    return {"archived": archived, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+
+def _db_file_bytes() -> int:
+    return sum(p.stat().st_size for p in (DB_PATH, Path(f"{DB_PATH}-wal")) if p.exists())
+
+
+@metrics.traced()
+def archive_stats() -> Dict[str, Any]:
+    """Rows in the archive, uncompressed vs stored bytes, και το μέγεθος του DB file."""
+    cur = get_conn().cursor()
+    cur.execute("""
+        SELECT COUNT(*) AS n, COALESCE(SUM(raw_bytes), 0) AS raw,
+               COALESCE(SUM(length(review_z) + length(reply_z) + length(issues_z) + length(highlights_z)), 0) AS stored
+        FROM history_archive
+    """)
+    r = cur.fetchone()
+    cur.execute("SELECT COALESCE(SUM(length(data)), 0) FROM archive_dicts")
+    dict_bytes = cur.fetchone()[0]
+    cur.execute("SELECT codec FROM archive_dicts ORDER BY id DESC LIMIT 1")
+    codec = cur.fetchone()
+    return {
+        "rows": r["n"],
+        "raw_bytes": r["raw"],
+        "stored_bytes": r["stored"] + dict_bytes,
+        "saved_bytes": r["raw"] - r["stored"] - dict_bytes,
+        "ratio": round(r["raw"] / (r["stored"] + dict_bytes), 2) if r["stored"] else None,
+        "codec": codec["codec"] if codec else None,
+        "file_bytes": _db_file_bytes(),
+    }
+
+
+@metrics.traced()
+def compact_history(batch_size: int = ARCHIVE_BATCH) -> Dict[str, Any]:
+    """
+    Retrains the archive dictionary on the current archive, recompresses every row with it
+    (και με zstd αν έγινε διαθέσιμο), optimizes FTS, then VACUUM. Returns archive_stats()
+    plus the DB file size before/after.
+    """
+    file_before = _db_file_bytes()
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("DELETE FROM history")
-    conn.commit()
-    conn.close()
+    cur.execute("SELECT * FROM history_archive ORDER BY id DESC LIMIT ?", (archive.TRAIN_SAMPLES,))
+    samples = cur.fetchall()
+    if samples:
+        codecs = {}
+        texts = []
+        for row in samples:
+            codecs.setdefault(row["dict_id"], _archive_codec(row["dict_id"]))
+            item = _unarchive(row, codecs[row["dict_id"]])
+            texts += [item["review"], item["reply"], item["issues_json"], item["highlights_json"]]
+        dict_id = _new_archive_dict(conn, texts)
+        codec = _archive_codec(dict_id)
+
+        last_id = -1
+        while True:
+            with conn:
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM history_archive WHERE id > ? AND dict_id != ? ORDER BY id LIMIT ?",
+                            (last_id, dict_id, batch_size))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                params = []
+                for row in rows:
+                    codecs.setdefault(row["dict_id"], _archive_codec(row["dict_id"]))
+                    params.append(_archive_params(_unarchive(row, codecs[row["dict_id"]]), dict_id, codec))
+                cur.executemany(f"INSERT OR REPLACE INTO history_archive ({', '.join(_ARCHIVE_COLUMNS)}) "
+                                f"VALUES ({', '.join('?' * len(_ARCHIVE_COLUMNS))})", params)
+                last_id = rows[-1]["id"]
+
+    with conn:
+        conn.execute("DELETE FROM archive_dicts WHERE id NOT IN (SELECT DISTINCT dict_id FROM history_archive)")
+        conn.execute("INSERT INTO history_fts(history_fts) VALUES ('optimize')")
+    _archive_dicts.clear()
+    # VACUUM δεν τρέχει μέσα σε transaction· το checkpoint μικραίνει και το -wal
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {**archive_stats(), "file_bytes_before": file_before, "file_bytes_after": _db_file_bytes()}
+
+
+# ---------------------------
+# History export / import (streaming)
+# ---------------------------
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_CHUNK_ROWS = 1000
+IMPORT_CHUNK_ROWS = 500
+
+HISTORY_COLUMNS = [
+    "id", "created_at", "property_name", "platform", "tone", "language", "length", "sentiment",
+    "issues_json", "summary", "highlights_json", "review", "reply", "content_hash",
+]
+# defaults για πεδία που λείπουν σε εξωτερικά αρχεία
+_IMPORT_DEFAULTS = {
+    "property_name": "", "platform": "Other", "tone": "", "language": "", "length": "",
+    "sentiment": "mixed", "issues_json": "[]", "summary": "", "highlights_json": "[]", "reply": "",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet needs the optional 'pyarrow' package (pip install pyarrow).") from e
+    return pyarrow
+
+
+_HISTORY_ORDER = {
+    "id": ("id", lambda r: r["id"]),
+    "property": ("property_name, created_at, id", lambda r: (r["property_name"] or "", r["created_at"], r["id"])),
+}
+
+
+def _fetch_chunks(cur: sqlite3.Cursor, chunk_size: int) -> Iterator[sqlite3.Row]:
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def iter_history(
+    chunk_size: int = EXPORT_CHUNK_ROWS,
+    order_by: str = "id",
+    include_archive: bool = False,
+    **filters: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    All matching history rows fetched `chunk_size` at a time (constant memory),
+    ordered by id or by ("property") property_name → created_at.
+    include_archive: merges in the decompressed archived rows, in the same order.
+    """
+    order_sql, order_key = _HISTORY_ORDER[order_by]
+    where, params = _history_filters(**filters)
+    tail = (" WHERE " + " AND ".join(where) if where else "") + f" ORDER BY {order_sql}"
+    cur = get_conn().cursor()
+    cur.execute(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM history{tail}", params)
+    hot = (dict(r) for r in _fetch_chunks(cur, chunk_size))
+    if not include_archive:
+        yield from hot
+        return
+
+    acur = get_conn().cursor()
+    acur.execute(f"SELECT * FROM history_archive{tail}", params)
+    codecs: Dict[int, archive.TextCodec] = {}
+
+    def cold() -> Iterator[Dict[str, Any]]:
+        for r in _fetch_chunks(acur, chunk_size):
+            if r["dict_id"] not in codecs:
+                codecs[r["dict_id"]] = _archive_codec(r["dict_id"])
+            yield _unarchive(r, codecs[r["dict_id"]])
+
+    yield from heapq.merge(hot, cold(), key=order_key)
+
+
+@metrics.traced()
+def count_history(include_archive: bool = False, **filters: Any) -> int:
+    """Πόσα rows θα έδινε το iter_history με τα ίδια filters (π.χ. για progress bars)."""
+    where, params = _history_filters(**filters)
+    tail = " WHERE " + " AND ".join(where) if where else ""
+    cur = get_conn().cursor()
+    cur.execute(f"SELECT COUNT(*) FROM history{tail}", params)
+    n = cur.fetchone()[0]
+    if include_archive:
+        cur.execute(f"SELECT COUNT(*) FROM history_archive{tail}", params)
+        n += cur.fetchone()[0]
+    return n
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ByteSink:
+    """Write-only file object για τον ParquetWriter· τα bytes αδειάζουν μετά από κάθε row group."""
+
+    def __init__(self) -> None:
+        self.parts: List[bytes] = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self.parts)
+        self.parts = []
+        return out
+
+
+def export_history(
+    fmt: str,
+    chunk_size: int = EXPORT_CHUNK_ROWS,
+    include_archive: bool = True,
+    **filters: Any,
+) -> Iterator[bytes]:
+    """
+    Streams the filtered history (archived rows included by default) as CSV / JSONL / Parquet
+    bytes, one piece per `chunk_size` rows. Memory stays flat regardless of the table size.
+    Parquet needs pyarrow.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected one of {EXPORT_FORMATS})")
+    rows = iter_history(chunk_size, include_archive=include_archive, **filters)
+    # χωρίς το "archived" flag των archived rows: ίδιες στήλες με το import
+    chunks = _chunks(({k: r[k] for k in HISTORY_COLUMNS} for r in rows), chunk_size)
+
+    if fmt == "jsonl":
+        for chunk in chunks:
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk).encode("utf-8")
+        return
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=HISTORY_COLUMNS)
+        writer.writeheader()
+        yield buf.getvalue().encode("utf-8-sig")  # BOM: το Excel ανοίγει σωστά τα ελληνικά
+        for chunk in chunks:
+            buf.seek(0)
+            buf.truncate()
+            writer.writerows(chunk)
+            yield buf.getvalue().encode("utf-8")
+        return
+
+    pa = _pyarrow()
+    schema = pa.schema([("id", pa.int64())] + [(c, pa.string()) for c in HISTORY_COLUMNS[1:]])
+    sink = _ByteSink()
+    writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def read_history_file(f: BinaryIO, fmt: str, chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """Streams rows από ένα binary file object σε μορφή export_history (CSV / JSONL / Parquet)."""
+    if fmt == "parquet":
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(f).iter_batches(batch_size=chunk_size):
+            yield from batch.to_pylist()
+        return
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt!r} (expected one of {EXPORT_FORMATS})")
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "jsonl":
+            for line in text:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(text)
+    finally:
+        text.detach()  # το f ανήκει στον caller
+
+
+def _import_row(rec: Dict[str, Any]) -> Optional[Tuple]:
+    row = {k: v for k, v in rec.items() if v is not None and v != ""}
+    if not row.get("review"):
+        return None
+    row = {**_IMPORT_DEFAULTS, **row}
+    row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+    # το hash ξαναϋπολογίζεται: ένα αρχείο δεν είναι αξιόπιστη πηγή για το dedup key
+    h = history_content_hash(row)
+    return (
+        str(row["created_at"]), str(row["property_name"]), str(row["platform"]), str(row["tone"]),
+        str(row["language"]), str(row["length"]), str(row["sentiment"]), str(row["issues_json"]),
+        str(row["summary"]), str(row["highlights_json"]), str(row["review"]), str(row["reply"]), h, h, h,
+    )
+
+
+@metrics.traced()
+def import_history(rows: Iterable[Dict[str, Any]], chunk_size: int = IMPORT_CHUNK_ROWS) -> Dict[str, int]:
+    """
+    Bulk insert from any row iterable (π.χ. read_history_file), one transaction per chunk.
+    Rows whose content hash already exists (στη DB, στο archive ή νωρίτερα στο ίδιο αρχείο) are skipped.
+    Returns {"imported", "skipped", "invalid"}.
+    """
+    stats = {"imported": 0, "skipped": 0, "invalid": 0}
+    conn = get_conn()
+    for chunk in _chunks(rows, chunk_size):
+        params = []
+        for rec in chunk:
+            p = _import_row(rec)
+            if p is None:
+                stats["invalid"] += 1
+            else:
+                params.append(p)
+        if not params:
+            continue
+        with conn:
+            cur = conn.cursor()
+            # IMMEDIATE: κανένας άλλος writer ανάμεσα στο MAX(id) και το insert
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM history")
+            max_id = cur.fetchone()[0]
+            cur.executemany("""
+                INSERT INTO history (
+                    created_at, property_name, platform, tone, language, length,
+                    sentiment, issues_json, summary, highlights_json, review, reply, content_hash
+                )
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM history WHERE content_hash = ?)
+                  AND NOT EXISTS (SELECT 1 FROM history_archive WHERE content_hash = ?)
+            """, params)
+            cur.execute("SELECT id, issues_json, review FROM history WHERE id > ?", (max_id,))
+            new_rows = cur.fetchall()
+            conn.executemany(
+                "INSERT INTO history_issues (history_id, label, severity, note) VALUES (?, ?, ?, ?)",
+                [it for r in new_rows for it in _issue_rows(r["id"], r["issues_json"])],
+            )
+            for r in new_rows:
+                _insert_signature(conn, r["id"], r["review"])
+        stats["imported"] += len(new_rows)
+        stats["skipped"] += len(params) - len(new_rows)
+    return stats
+
+
+# ---------------------------
+# LLM response cache
+# ---------------------------
+class _CachePending:
+    """Hits / misses και per-entry touches που δεν έχουν γραφτεί ακόμα (ανά db path)."""
+
+    def __init__(self) -> None:
+        self.lookups = 0
+        self.counters = {"hits": 0, "misses": 0}
+        self.touched: Dict[str, List[float]] = {}  # k → [last_used, hits]
+
+
+_cache_lock = threading.Lock()
+_cache_pending: Dict[str, _CachePending] = {}
+
+
+def _llm_cache_add_counters(cur: sqlite3.Cursor, counters: Dict[str, int]) -> None:
+    cur.executemany("""
+        INSERT INTO llm_cache_counters (name, n) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET n = n + excluded.n
+    """, [(name, n) for name, n in counters.items() if n])
+
+
+def _llm_cache_take_pending() -> Optional[_CachePending]:
+    with _cache_lock:
+        pending = _cache_pending.pop(DB_PATH.as_posix(), None)
+    return pending if pending and pending.lookups else None
+
+
+def _llm_cache_restore(pending: _CachePending) -> None:
+    # το write απέτυχε / αναβλήθηκε: ξανά στη μνήμη, μαζί με ό,τι μαζεύτηκε στο μεταξύ
+    with _cache_lock:
+        cur = _cache_pending.setdefault(DB_PATH.as_posix(), _CachePending())
+        cur.lookups += pending.lookups
+        for name, n in pending.counters.items():
+            cur.counters[name] += n
+        for k, (last_used, hits) in pending.touched.items():
+            t = cur.touched.setdefault(k, [0.0, 0])
+            t[0] = max(t[0], last_used)
+            t[1] += hits
+
+
+def _llm_cache_flush(cur: Optional[sqlite3.Cursor] = None) -> None:
+    """Γράφει τα pending counters/touches· με `cur`, μέσα στο transaction του caller."""
+    pending = _llm_cache_take_pending()
+    if pending is None:
+        return
+    params = [(hits, last_used, k) for k, (last_used, hits) in pending.touched.items()]
+    sql = "UPDATE llm_cache SET hits = hits + ?, last_used = MAX(last_used, ?) WHERE k=?"
+    if cur is not None:
+        _llm_cache_add_counters(cur, pending.counters)
+        cur.executemany(sql, params)
+        return
+    try:
+        conn = get_conn()
+        if conn.in_transaction:
+            _llm_cache_restore(pending)  # μην κάνεις commit ξένο transaction· στο επόμενο flush
+            return
+        with conn:
+            c = conn.cursor()
+            _llm_cache_add_counters(c, pending.counters)
+            c.executemany(sql, params)
+    except sqlite3.Error:
+        _llm_cache_restore(pending)
+
+
+atexit.register(_llm_cache_flush)
+
+
+@metrics.traced()
+def llm_cache_get(key: str, ttl_s: float = LLM_CACHE_TTL_S) -> Optional[str]:
+    """
+    Read-only στη συνήθη περίπτωση: τα hits/misses και το last_used (LRU) μαζεύονται
+    στη μνήμη και γράφονται μαζί ανά LLM_CACHE_FLUSH_LOOKUPS lookups.
+    """
+    now = time.time()
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT v, created_at FROM llm_cache WHERE k=?", (key,))
+    row = cur.fetchone()
+    expired = row is not None and now - row["created_at"] > ttl_s
+    if expired:
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE k=?", (key,))
+        row = None
+
+    with _cache_lock:
+        pending = _cache_pending.setdefault(DB_PATH.as_posix(), _CachePending())
+        pending.lookups += 1
+        if row:
+            pending.counters["hits"] += 1
+            t = pending.touched.setdefault(key, [0.0, 0])
+            t[0] = now
+            t[1] += 1
+        else:
+            pending.counters["misses"] += 1
+        due = pending.lookups >= LLM_CACHE_FLUSH_LOOKUPS
+    if due:
+        _llm_cache_flush()
+    return row["v"] if row else None
+
+
+@metrics.traced()
+def llm_cache_put(
+    key: str,
+    value: str,
+    max_entries: int = LLM_CACHE_MAX_ENTRIES,
+    ttl_s: float = LLM_CACHE_TTL_S,
+) -> None:
+    now = time.time()
+    conn = get_conn()
+    with conn:
+        cur = conn.cursor()
+        # pending touches πρώτα, ώστε το LRU eviction να βλέπει τα τρέχοντα last_used
+        _llm_cache_flush(cur)
+        cur.execute("""
+            INSERT INTO llm_cache (k, v, created_at, last_used, hits) VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT(k) DO UPDATE SET v=excluded.v, created_at=excluded.created_at, last_used=excluded.last_used
+        """, (key, value, now, now))
+        # TTL + LRU eviction
+        cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - ttl_s,))
+        cur.execute("SELECT COUNT(*) AS n FROM llm_cache")
+        excess = cur.fetchone()["n"] - max_entries
+        if excess > 0:
+            cur.execute("""
+                DELETE FROM llm_cache WHERE k IN (
+                    SELECT k FROM llm_cache ORDER BY last_used ASC LIMIT ?
+                )
+            """, (excess,))
+
+
+@metrics.traced()
+def llm_cache_stats() -> Dict[str, Any]:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(LENGTH(v)), 0) AS bytes FROM llm_cache")
+    row = dict(cur.fetchone())
+    cur.execute("SELECT name, n FROM llm_cache_counters")
+    counters = {r["name"]: r["n"] for r in cur.fetchall()}
+    # + ό,τι δεν έχει γραφτεί ακόμα (χωρίς write εδώ)
+    with _cache_lock:
+        pending = _cache_pending.get(DB_PATH.as_posix())
+        for name in ("hits", "misses"):
+            row[name] = counters.get(name, 0) + (pending.counters[name] if pending else 0)
+    return row
+
+
+@metrics.traced()
+def llm_cache_clear() -> None:
+    conn = get_conn()
+    with _cache_lock:
+        _cache_pending.pop(DB_PATH.as_posix(), None)
+    with conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_cache")
+        cur.execute("DELETE FROM llm_cache_counters")
+
+
+# ---------------------------
+# Issue analytics (SQL-side aggregation πάνω στο history_issues)
+# ---------------------------
+_BUCKETS = {
+    "day": "substr(created_at, 1, 10)",
+    "week": "strftime('%Y-W%W', substr(created_at, 1, 19))",
+    "month": "substr(created_at, 1, 7)",
+    "quarter": "substr(created_at, 1, 4) || '-Q' || ((CAST(substr(created_at, 6, 2) AS INTEGER) + 2) / 3)",
+    "year": "substr(created_at, 1, 4)",
+}
+
+_GROUPS = {
+    "label": "label",
+    "property": "property_name",
+}
+
+
+@metrics.traced()
+def issue_stats(
+    group_by: Tuple[str, ...] = ("label",),
+    bucket: Optional[str] = None,
+    property_name: Optional[str] = None,
+    label: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_severity: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Issue counts + mean severity, grouped by any of ("label", "property")
+    and optionally by time bucket ("day" | "week" | "month" | "quarter" | "year").
+    Covers hot and archived reviews (τα issues των archived rows μένουν στο history_issues).
+    Rows: {label?, property?, bucket?, issues, reviews, mean_severity}
+    """
+    cols = [f"{_GROUPS[g]} AS {g}" for g in group_by]
+    keys = list(group_by)
+    if bucket:
+        cols.append(f"{_BUCKETS[bucket]} AS bucket")
+        keys.append("bucket")
+
+    where, params = [], []
+    if property_name is not None:
+        where.append("h.property_name = ?")
+        params.append(property_name)
+    if label:
+        where.append("i.label = ?")
+        params.append(label)
+    if date_from:
+        where.append("h.created_at >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("h.created_at < ?")
+        params.append(date_to)
+    if min_severity is not None:
+        where.append("i.severity >= ?")
+        params.append(min_severity)
+
+    # ένα arm ανά tier, ώστε κάθε join / filter να μένει indexed lookup
+    arms = []
+    for table in ("history", "history_archive"):
+        arm = ("SELECT i.history_id, i.label, i.severity, h.created_at, h.property_name "
+               f"FROM history_issues i JOIN {table} h ON h.id = i.history_id")
+        if where:
+            arm += " WHERE " + " AND ".join(where)
+        arms.append(arm)
+    params = params * len(arms)
+
+    sql = "SELECT " + ", ".join(cols + [
+        "COUNT(*) AS issues",
+        "COUNT(DISTINCT history_id) AS reviews",
+        "ROUND(AVG(severity), 2) AS mean_severity",
+    ]) + " FROM (" + " UNION ALL ".join(arms) + ")"
+    if keys:
+        sql += " GROUP BY " + ", ".join(keys)
+        sql += " ORDER BY " + ("bucket, " if bucket else "") + "issues DESC"
+
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    return [dict(r) for r in cur.fetchall()]
+
+
+# ---------------------------
+# Metrics (tracing spans)
+# ---------------------------
+# db path → time.monotonic() του τελευταίου retention prune (ανά process)
+_metrics_pruned: Dict[str, float] = {}
+
+
+def metrics_write_many(rows: List[Tuple]) -> None:
+    """Rows από το metrics buffer: (ts, stage, property_name, model, duration_ms, prompt_tokens,
+    completion_tokens, cached_tokens, cache_hit, ok).
+    Στο ίδιο transaction, το πολύ μία φορά ανά METRICS_PRUNE_INTERVAL_S, σβήνει spans
+    παλαιότερα από METRICS_RETENTION_DAYS (όχι στο init_db, που τρέχει σε κάθε rerun)."""
+    conn = get_conn()
+    key = DB_PATH.as_posix()
+    prune = time.monotonic() - _metrics_pruned.get(key, float("-inf")) >= METRICS_PRUNE_INTERVAL_S
+    with conn:
+        conn.executemany("""
+            INSERT INTO metrics (ts, stage, property_name, model, duration_ms, prompt_tokens,
+                                 completion_tokens, cached_tokens, cache_hit, ok)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        if prune:
+            conn.execute("DELETE FROM metrics WHERE ts < ?", (time.time() - METRICS_RETENTION_DAYS * 86400,))
+    if prune:
+        _metrics_pruned[key] = time.monotonic()
+
+
+_METRIC_GROUPS = {
+    "stage": "stage",
+    "property": "property_name",
+    "model": "model",
+    "day": "date(ts, 'unixepoch')",
+}
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def metrics_summary(
+    group_by: Tuple[str, ...] = ("stage",),
+    since_ts: Optional[float] = None,
+    stage_prefix: Optional[str] = None,
+    property_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Per group (any of "stage", "property", "model", "day"): calls, errors, cache_hits,
+    p50/p95/p99/mean latency (ms), token sums και estimated cost (USD).
+    """
+    keys = [f"{_METRIC_GROUPS[g]} AS {g}" for g in group_by]
+    where, params = [], []
+    if since_ts is not None:
+        where.append("ts >= ?")
+        params.append(since_ts)
+    if stage_prefix:
+        where.append("stage LIKE ?")
+        params.append(stage_prefix + "%")
+    if property_name is not None:
+        where.append("property_name = ?")
+        params.append(property_name)
+    sql = "SELECT " + ", ".join(keys + [
+        "model", "duration_ms", "prompt_tokens", "completion_tokens", "cached_tokens", "cache_hit", "ok",
+    ]) + " FROM metrics"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + ", ".join(list(group_by) + ["duration_ms"])
+
+    cur = get_conn().cursor()
+    cur.execute(sql, params)
+    out: List[Dict[str, Any]] = []
+    group_key, durations, acc = None, [], {}
+
+    def close_group() -> None:
+        if durations:
+            out.append({
+                **dict(zip(group_by, group_key)),
+                **acc,
+                "p50_ms": round(_percentile(durations, 50), 1),
+                "p95_ms": round(_percentile(durations, 95), 1),
+                "p99_ms": round(_percentile(durations, 99), 1),
+                "mean_ms": round(sum(durations) / len(durations), 1),
+                "cost_usd": round(acc["cost_usd"], 4),
+            })
+
+    # ordered by group → ένα pass, μόνο τα durations του τρέχοντος group στη μνήμη
+    while True:
+        rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            break
+        for r in rows:
+            k = tuple(r[g] for g in group_by)
+            if k != group_key:
+                close_group()
+                group_key, durations = k, []
+                acc = {"calls": 0, "errors": 0, "cache_hits": 0, "prompt_tokens": 0,
+                       "completion_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0}
+            durations.append(r["duration_ms"])
+            acc["calls"] += 1
+            acc["errors"] += 0 if r["ok"] else 1
+            acc["cache_hits"] += r["cache_hit"]
+            acc["prompt_tokens"] += r["prompt_tokens"]
+            acc["completion_tokens"] += r["completion_tokens"]
+            acc["cached_tokens"] += r["cached_tokens"]
+            if r["prompt_tokens"] or r["completion_tokens"]:
+                acc["cost_usd"] += metrics.estimate_cost(r["model"], r["prompt_tokens"],
+                                                         r["completion_tokens"], r["cached_tokens"])
+    close_group()
+    return out
+
+
+def metrics_clear() -> None:
+    conn = get_conn()
+    with conn:
+        conn.execute("DELETE FROM metrics")
@@ -0,0 +1,71 @@
+"""
+Near-duplicate review detection: MinHash signatures + LSH banding.
+
+Το ίδιο review σε Airbnb και Booking (ή ελαφρώς διορθωμένο) δίνει σχεδόν
+ίδιο signature· το LSH index (db.history_lsh) βρίσκει τους candidates χωρίς
+να σαρώνει όλο το history.
+"""
+import hashlib
+import random
+import re
+import struct
+import unicodedata
+from typing import List, Set
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 4 → threshold ≈ (1/BANDS) ** (1/ROWS) ≈ 0.5
+SHINGLE_WORDS = 2
+DEFAULT_THRESHOLD = 0.8
+
+_MERSENNE = (1 << 61) - 1
+_MASK32 = (1 << 32) - 1
+
+_rng = random.Random(20240601)  # σταθερό seed: τα signatures πρέπει να είναι ίδια σε κάθε process
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(text: str) -> List[str]:
+    # lowercase + χωρίς τόνους, ώστε "Υπέροχο" == "υπεροχο"
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WORD.findall(text)
+
+
+def shingles(text: str) -> Set[int]:
+    words = _normalize(text)
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams}
+
+
+def minhash(text: str) -> List[int]:
+    sh = shingles(text)
+    if not sh:
+        return [_MASK32] * NUM_PERM
+    return [min(((a * x + b) % _MERSENNE) & _MASK32 for x in sh) for a, b in _PERMS]
+
+
+def pack(sig: List[int]) -> bytes:
+    return struct.pack(f"<{NUM_PERM}I", *sig)
+
+
+def unpack(blob: bytes) -> List[int]:
+    return list(struct.unpack(f"<{NUM_PERM}I", blob))
+
+
+def band_keys(sig: List[int]) -> List[str]:
+    """One bucket key per band (hex του hash των ROWS τιμών)."""
+    return [
+        hashlib.blake2b(struct.pack(f"<{ROWS}I", *sig[i * ROWS:(i + 1) * ROWS]), digest_size=8).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
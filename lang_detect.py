@@ -0,0 +1,158 @@
+"""
+Local (offline) language detection για τα reviews.
+
+Unicode script ανά λέξη (Greek vs Latin) + μικρό character trigram profile
+για EN / DE / FR / IT / ES, επιβεβαιωμένο με function words. Δεν κάνει κανένα
+API call· το utils.detect_language πέφτει στο LLM μόνο όταν το confidence είναι
+χαμηλό, και το "Mixed" έχει πάντα χαμηλό confidence (αποφασίζει το LLM).
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Tuple
+
+MIN_CONFIDENCE = 0.6
+
+# Κάτω από τόσα γράμματα το confidence μειώνεται αναλογικά
+_FULL_CONFIDENCE_LETTERS = 30
+
+# Ποσοστό ελληνικών λέξεων για "Greek" / "Mixed". Λατινικές λέξεις με κεφαλαίο μέσα σε
+# ελληνικό κείμενο (Airbnb, Santorini, Starbucks) είναι ονόματα, όχι η γλώσσα του review.
+_GREEK_RATIO = 0.6
+_MIXED_RATIO = 0.2
+_MIXED_CONFIDENCE = 0.3
+
+# Χωρίς καμία function word της γλώσσας το trigram αποτέλεσμα δεν είναι αξιόπιστο
+# (σύντομα reviews με λατινογενείς λέξεις: "excellent", "impeccable" → French)
+_NO_FUNCTION_WORDS_CONFIDENCE = 0.5
+_FUNCTION_WORDS: Dict[str, set] = {
+    "English": set("the and was were with very for is are it this that we our my to of in at on a an "
+                   "had have has but not from you they would will".split()),
+    "German": set("der die das und ist war sehr mit für ein eine nicht wir es zu im den dem auch sind "
+                  "waren uns auf".split()),
+    "French": set("le la les et est était très avec pour un une des du de nous pas au en ce qui que "
+                  "sont mais".split()),
+    "Italian": set("il lo la gli le e è era molto con per un una del della di che non siamo ci sono "
+                   "ma anche".split()),
+    "Spanish": set("el la los las y es era muy con para un una del de que no nos fue pero también "
+                   "estaba".split()),
+}
+
+# Συχνά trigrams ανά γλώσσα (πρώτα = πιο συχνά). Τα κενά σημαίνουν όρια λέξης.
+_PROFILES_RAW: Dict[str, str] = {
+    "English": (
+        " th|the|he |and| an|nd | in|ing|ng | to|to |ed | of|of |is | is|er |was| wa|as |"
+        "at |for| fo|or |on | be|it | it|ery|ver| ve|ly | gr|gre|eat| we|our|ous|hos|ost|"
+        " ho|re | yo|you|ou |ith|wit| wi|ice| cl|cle|ean| ni|nic| st|tay"
+    ),
+    "German": (
+        "en |er | de|der|ie |ich|ein| ei|sch|che|die| di|und| un|nd |cht|ch |den|in |te |"
+        "ine| da|das|ten|gen|ung| se|ei | wa|war|ar |ist| is|st | zu|zu |seh|ehr|hr |ge |"
+        " ge|nic|lic|ber|auf| au|sse|ßen|für|ür | fü|ön |sch|gut|ut |ohn|hnu|nun|eit"
+    ),
+    "French": (
+        "es | de|de |le | le|ent|nt | la|la |re |ion|les| et|et |que| qu|ue |ne | pa|tre|"
+        "our| po| un|une|des|est| es|ait|tai|été|té |s d|ous|pou|ès |trè|rès| tr|ell|lle|"
+        "ons| no|nou|ux |eau|vou| vo|tio|ien|bie| bi| ét|ça | à "
+    ),
+    "Italian": (
+        " di|di |to |la | la|che|he | ch|del|ell|lla|ent|re |ion|one|ne |no | co|con|per|"
+        " pe|er |ato|ta |ett|tto|sta| st|mol|olt|lto|ott|tti|zio|ia |are|ere|ed |ro |ssi|"
+        "tut|utt| ca|cas|asa|nza|ggi|ma | il|il |tà |più|iù |rò |gli|li "
+    ),
+    "Spanish": (
+        " de|de |os |la | la|el | el|en | en|es |as |que| qu|ue |ent| lo|los|ado|do | co|"
+        "con|ión|ón | pa|par|ara|ía |muy| mu|uy |est| es|sta|ien|mos|ida|aci|ció|nte|ar |"
+        "ero|er | y | ca|cas|asa|ño |ñ|¡|¿|fue|ue |mpi|lim"
+    ),
+}
+
+
+def _build_profile(raw: str) -> Dict[str, float]:
+    grams = [g for g in raw.split("|") if g]
+    n = len(grams)
+    profile: Dict[str, float] = {}
+    for rank, g in enumerate(grams):
+        # γραμμικό βάρος κατά rank: 1.0 για το πρώτο, ~0.5 για το τελευταίο
+        profile.setdefault(g, 1.0 - 0.5 * rank / max(n - 1, 1))
+    return profile
+
+
+_PROFILES: Dict[str, Dict[str, float]] = {lang: _build_profile(raw) for lang, raw in _PROFILES_RAW.items()}
+
+_NON_LETTERS = re.compile(r"[^\w]+|[\d_]+")
+_WORDS = re.compile(r"[^\W\d_]+")
+
+
+def _script_counts(text: str) -> Tuple[int, int, int]:
+    greek = latin = other = 0
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        o = ord(ch)
+        if 0x0370 <= o <= 0x03FF or 0x1F00 <= o <= 0x1FFF:
+            greek += 1
+        elif o < 0x0250 or 0x1E00 <= o <= 0x1EFF:
+            latin += 1
+        else:
+            other += 1
+    return greek, latin, other
+
+
+def _greek_word_share(text: str) -> float:
+    greek = latin = 0
+    for w in _WORDS.findall(text):
+        g, l, _ = _script_counts(w)
+        if g > l:
+            greek += 1
+        elif l and not w[0].isupper():
+            latin += 1
+    return greek / (greek + latin) if greek + latin else 1.0
+
+
+def _latin_scores(text: str) -> Dict[str, float]:
+    cleaned = " " + _NON_LETTERS.sub(" ", unicodedata.normalize("NFC", text.lower())).strip() + " "
+    counts = Counter(cleaned[i:i + 3] for i in range(len(cleaned) - 2))
+    # single-char markers (ñ, ¿, ...) μετράνε κι αυτά
+    counts.update(ch for ch in text.lower() if ch in "ñ¡¿")
+    total = max(sum(counts.values()), 1)
+    return {
+        lang: sum(w * counts[g] for g, w in profile.items() if g in counts) / total
+        for lang, profile in _PROFILES.items()
+    }
+
+
+def detect(text: str) -> Tuple[str, float]:
+    """
+    Returns (language, confidence 0..1).
+    language: "English" | "Greek" | "Mixed" | "German" | "French" | "Italian" | "Spanish"
+    """
+    greek, latin, other = _script_counts(text or "")
+    letters = greek + latin + other
+    if letters == 0:
+        return "English", 0.0
+
+    length_factor = min(1.0, letters / _FULL_CONFIDENCE_LETTERS)
+    if greek:
+        g = _greek_word_share(text)
+        if g >= _GREEK_RATIO:
+            return "Greek", round(min(1.0, g + 0.2) * length_factor, 3)
+        if g > _MIXED_RATIO:
+            return "Mixed", _MIXED_CONFIDENCE
+    if other > latin:
+        # άλλο script (κυριλλικά, CJK, ...): δεν το καλύπτουμε
+        return "English", 0.0
+
+    scores = _latin_scores(text)
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    best_lang, best = ranked[0]
+    second = ranked[1][1]
+    if best <= 0:
+        return "English", 0.0
+
+    margin = (best - second) / best
+    confidence = min(1.0, 0.35 + 1.3 * margin) * length_factor
+    words = _NON_LETTERS.sub(" ", text.lower()).split()
+    if not any(w in _FUNCTION_WORDS[best_lang] for w in words):
+        confidence = min(confidence, _NO_FUNCTION_WORDS_CONFIDENCE)
+    return best_lang, round(confidence, 3)
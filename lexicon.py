@@ -0,0 +1,257 @@
+"""
+Local lexicon classifier (EN + EL) για sentiment και issue tagging.
+
+Sparse "vectorized" scoring: το review γίνεται bag-of-stems (Counter) και
+παίρνει dot product με τα weight vectors του lexicon. Επιστρέφει analysis dict
+στο ίδιο schema με το utils.analyze_review σε < 1 ms. Το utils πέφτει στο LLM
+όταν το confidence είναι χαμηλό ή υπάρχουν αρνητικά σήματα (negative words,
+οποιαδήποτε άρνηση, "but"/"αλλά"): παράπονα όπως "the AC didn't work" δεν έχουν
+λέξη του lexicon, μόνο την άρνηση. Και επειδή "καμία γνωστή αρνητική λέξη" δεν
+σημαίνει "κανένα παράπονο" ("the toilet was clogged"), το fast path θέλει σχεδόν
+κάθε content token να είναι γνωστό (MAX_UNKNOWN_SHARE).
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+MIN_CONFIDENCE = 0.75
+MAX_FAST_PATH_WORDS = 80
+# μέγιστο ποσοστό content tokens (εκτός stopwords) που δεν ξέρει το lexicon
+MAX_UNKNOWN_SHARE = 0.1
+
+# stem → weight. Τα stems ταιριάζουν ως prefix (min 3 χαρακτήρες), χωρίς τόνους.
+POSITIVE: Dict[str, float] = {
+    # EN
+    "great": 1.0, "excellent": 1.5, "amazing": 1.5, "wonderful": 1.5, "perfect": 1.5, "lovely": 1.0,
+    "clean": 1.0, "spotless": 1.5, "beautiful": 1.0, "comfortable": 1.0, "comfy": 1.0, "friendly": 1.0,
+    "helpful": 1.0, "fantastic": 1.5, "awesome": 1.5, "recommend": 1.5, "nice": 0.7, "cozy": 1.0,
+    "cosy": 1.0, "quiet": 1.0, "responsive": 1.0, "superb": 1.5, "gorgeous": 1.5, "stunning": 1.5,
+    "best": 1.0, "enjoy": 1.0, "love": 1.0, "welcoming": 1.0, "convenient": 1.0, "delightful": 1.5,
+    "pleasant": 1.0, "thank": 0.5, "exceptional": 1.5, "immaculate": 1.5, "spacious": 1.0,
+    "impeccab": 1.5,
+    # EL
+    "τελει": 1.5, "υπεροχ": 1.5, "εξαιρετ": 1.5, "καθαρ": 1.0, "πεντακαθαρ": 1.5, "ωραι": 1.0,
+    "φανταστ": 1.5, "ευγεν": 1.0, "φιλικ": 1.0, "ανετ": 1.0, "ησυχ": 1.0, "ομορφ": 1.0,
+    "καταπληκτ": 1.5, "συστην": 1.5, "ευχαριστ": 0.5, "αψογ": 1.5, "ιδανικ": 1.5, "βολικ": 1.0,
+    "εξυπηρετ": 1.0, "απιθαν": 1.5, "ζεστο": 0.5, "φιλοξεν": 0.7, "μαγευτ": 1.5,
+}
+
+NEGATIVE: Dict[str, float] = {
+    # EN
+    "dirty": 1.5, "noisy": 1.0, "noise": 1.0, "broken": 1.5, "smell": 1.0, "stain": 1.0, "rude": 1.5,
+    "terrible": 2.0, "awful": 2.0, "horrible": 2.0, "bad": 1.0, "worst": 2.0, "disappoint": 1.5,
+    "cockroach": 2.0, "bugs": 1.5, "mold": 1.5, "mould": 1.5, "uncomfortable": 1.0, "cold": 0.7,
+    "delay": 1.0, "expensive": 1.0, "overpriced": 1.5, "problem": 1.0, "issue": 1.0, "complain": 1.0,
+    "unfortunately": 1.0, "poor": 1.0, "leak": 1.0, "dust": 1.0, "loud": 1.0, "unresponsive": 1.5,
+    "cancel": 1.0, "refund": 1.0, "lack": 0.7, "missing": 1.0, "hair": 0.7, "filthy": 2.0, "wait": 0.5,
+    "unsafe": 1.5, "misleading": 1.5, "small": 0.5, "hard": 0.5,
+    # EL
+    "βρωμ": 1.5, "ακαθαρ": 1.5, "θορυβ": 1.0, "φασαρ": 1.0, "χαλασμ": 1.5, "κακ": 1.0, "απαισ": 2.0,
+    "απογοητ": 1.5, "σκονη": 1.0, "υγρασ": 1.0, "κατσαριδ": 2.0, "ακριβ": 1.0, "αγεν": 1.5,
+    "καθυστερ": 1.0, "χαλια": 2.0, "μουχλ": 1.5, "λεκε": 1.0, "δυστυχ": 1.0, "προβλημ": 1.0,
+    "παραπον": 1.0, "ελλειψ": 0.7, "κρυο": 0.7, "μυριζ": 1.0, "μυρωδι": 1.0, "sadly": 1.0,
+}
+
+NEGATIONS = {
+    "not", "no", "never", "nothing", "without", "didn", "wasn", "isn", "doesn", "couldn", "wouldn",
+    "don", "aren", "weren", "hadn", "nor", "δεν", "μην", "οχι", "χωρις", "ουτε", "μηδε",
+}
+
+CONTRASTS = {
+    "but", "however", "although", "though", "except", "only", "αλλα", "ομως", "παρολο", "εκτος", "μονο",
+}
+
+# Λέξεις χωρίς sentiment που μετράνε ως "γνωστές" για το MAX_UNKNOWN_SHARE: stopwords (ακριβές
+# token) και ουδέτερα stems του domain (prefix, όπως τα υπόλοιπα)
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "at", "for", "with", "from", "by", "as", "is",
+    "are", "was", "were", "be", "been", "it", "its", "this", "that", "we", "our", "us", "i", "my", "me",
+    "you", "your", "he", "she", "they", "them", "his", "her", "their", "there", "here", "so", "very",
+    "really", "too", "also", "all", "just", "would", "will", "had", "have", "has", "did", "do", "again",
+    "more", "most", "much", "everything", "highly", "definitely", "absolutely", "such", "what", "who",
+    "ο", "η", "το", "οι", "τα", "του", "της", "των", "τον", "την", "στο", "στη", "στην", "στον", "στα",
+    "στις", "στους", "σε", "με", "και", "να", "για", "απο", "που", "ηταν", "ειναι", "πολυ", "ολα", "ολο",
+    "μας", "μου", "σας", "τους", "θα", "ξανα", "ενα", "μια", "επισης", "πιο", "σιγουρα", "οτι",
+}
+NEUTRAL = {
+    "stay", "place", "apartment", "flat", "house", "home", "villa", "room", "studio", "host", "view",
+    "time", "experience", "everyth", "would", "again", "visit", "famil", "trip", "holiday", "vacation",
+    "διαμον", "διαμερισμ", "σπιτ", "δωματι", "βιλα", "θεα", "εμπειρ", "διακοπ", "οικογεν", "ολα",
+    "στουντιο",
+}
+
+# stem → ISSUE_LABEL (για issues όταν είναι αρνητικό, για highlights όταν είναι θετικό)
+ASPECTS: Dict[str, str] = {
+    "clean": "cleanliness", "spotless": "cleanliness", "immaculate": "cleanliness", "dirty": "cleanliness",
+    "filthy": "cleanliness", "dust": "cleanliness", "stain": "cleanliness", "smell": "cleanliness",
+    "hair": "cleanliness", "mold": "cleanliness", "mould": "cleanliness", "cockroach": "cleanliness",
+    "bugs": "cleanliness", "καθαρ": "cleanliness", "πεντακαθαρ": "cleanliness", "βρωμ": "cleanliness",
+    "ακαθαρ": "cleanliness", "σκονη": "cleanliness", "λεκε": "cleanliness", "μουχλ": "cleanliness",
+    "κατσαριδ": "cleanliness", "μυριζ": "cleanliness", "μυρωδι": "cleanliness",
+    "quiet": "noise", "noisy": "noise", "noise": "noise", "loud": "noise", "ησυχ": "noise",
+    "θορυβ": "noise", "φασαρ": "noise",
+    "check": "check-in", "key": "check-in", "keys": "check-in", "wait": "check-in", "delay": "check-in",
+    "καθυστερ": "check-in", "κλειδ": "check-in",
+    "location": "location", "beach": "location", "central": "location", "convenient": "location",
+    "unsafe": "location", "τοποθεσ": "location", "θαλασσ": "location", "κεντρ": "location",
+    "βολικ": "location",
+    "comfortable": "comfort", "comfy": "comfort", "cozy": "comfort", "cosy": "comfort", "bed": "comfort",
+    "uncomfortable": "comfort", "cold": "comfort", "spacious": "comfort", "small": "comfort",
+    "hard": "comfort", "ανετ": "comfort", "κρεβατ": "comfort", "κρυο": "comfort", "υγρασ": "comfort",
+    "price": "value", "value": "value", "expensive": "value", "overpriced": "value", "refund": "value",
+    "ακριβ": "value", "τιμη": "value",
+    "host": "staff/service", "friendly": "staff/service", "helpful": "staff/service", "rude": "staff/service",
+    "welcoming": "staff/service", "staff": "staff/service", "ευγεν": "staff/service",
+    "φιλικ": "staff/service", "εξυπηρετ": "staff/service", "αγεν": "staff/service",
+    "οικοδεσποτ": "staff/service", "φιλοξεν": "staff/service",
+    "responsive": "communication", "unresponsive": "communication", "communication": "communication",
+    "reply": "communication", "επικοινων": "communication",
+    "wifi": "amenities", "kitchen": "amenities", "broken": "amenities", "leak": "amenities",
+    "missing": "amenities", "shower": "amenities", "towel": "amenities", "pool": "amenities",
+    "parking": "amenities", "χαλασμ": "amenities", "κλιματιστ": "amenities", "κουζιν": "amenities",
+    "ντουζ": "amenities", "πετσετ": "amenities", "παρκινγκ": "amenities", "πισιν": "amenities",
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_MIN_STEM = 3
+# Το summary που γράφει το fast path (πάντα θετικό)· έτσι ξεχωρίζουν τα rows του history
+# που δεν πέρασαν ποτέ από το LLM (βλ. bench/lexicon_report.py)
+_LOCAL_SUMMARY = re.compile(r"Positive review(?: praising [\w/, -]+)?\.")
+
+
+def tokenize(text: str) -> List[str]:
+    # lowercase + χωρίς τόνους (ίδια normalization με τα stems)
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WORD.findall(text)
+
+
+def _stem(token: str, vocab: Dict[str, Any]) -> Optional[str]:
+    for k in range(len(token), _MIN_STEM - 1, -1):
+        if token[:k] in vocab:
+            return token[:k]
+    return None
+
+
+_VOCAB = {**{s: None for s in ASPECTS}, **{s: None for s in POSITIVE}, **{s: None for s in NEGATIVE}}
+_KNOWN = {**_VOCAB, **{s: None for s in NEUTRAL}}
+
+
+def unknown_share(tokens: List[str]) -> float:
+    """Ποσοστό content tokens (όχι stopwords / αριθμοί / 1-2 γράμματα) που δεν ξέρει το lexicon."""
+    content = [t for t in tokens if len(t) > 2 and not t.isdigit() and t not in STOPWORDS]
+    if not content:
+        return 0.0
+    unknown = sum(1 for t in content
+                  if t not in NEGATIONS and t not in CONTRASTS and _stem(t, _KNOWN) is None)
+    return unknown / len(content)
+
+
+def _features(tokens: List[str]) -> Tuple[Counter, int, int, int, List[str]]:
+    """Bag of stems + πόσες αρνήσεις, negated sentiment terms και contrast words βρέθηκαν."""
+    stems: Counter = Counter()
+    negations = negated = contrasts = 0
+    negate_window = 0
+    negated_stems = []
+    for tok in tokens:
+        if tok in CONTRASTS:
+            contrasts += 1
+        if tok in NEGATIONS:
+            negations += 1
+            negate_window = 3
+            continue
+        stem = _stem(tok, _VOCAB)
+        if stem is not None:
+            if negate_window and (stem in POSITIVE or stem in NEGATIVE):
+                negated += 1
+                negated_stems.append(stem)
+            else:
+                stems[stem] += 1
+        negate_window = max(0, negate_window - 1)
+    return stems, negations, negated, contrasts, negated_stems
+
+
+def _dot(bag: Counter, weights: Dict[str, float]) -> float:
+    return sum(n * weights[s] for s, n in bag.items() if s in weights)
+
+
+def classify(text: str) -> Dict[str, Any]:
+    """
+    Local analysis στο schema του analyze_review, συν:
+      "confidence": 0..1 για το fast path, "negative_signals": bool,
+      "unknown_share": 0..1 (βλ. MAX_UNKNOWN_SHARE)
+    """
+    tokens = tokenize(text)
+    bag, negations, negated, contrasts, negated_stems = _features(tokens)
+    pos = _dot(bag, POSITIVE)
+    neg = _dot(bag, NEGATIVE)
+
+    if neg == 0 and negations == 0 and contrasts == 0 and pos > 0:
+        sentiment = "positive"
+    elif pos == 0 and neg > 0:
+        sentiment = "negative"
+    else:
+        sentiment = "mixed"
+
+    negative_signals = neg > 0 or negations > 0 or contrasts > 0
+    confidence = 0.0
+    if sentiment == "positive":
+        # περισσότερη θετική "μάζα" ανά λέξη → πιο σίγουρο· μεγάλα reviews κρύβουν περισσότερα
+        density = pos / max(len(tokens), 1)
+        confidence = min(1.0, 0.4 + 0.25 * pos + density)
+        if len(tokens) > MAX_FAST_PATH_WORDS:
+            confidence *= 0.5
+
+    issue_labels: Dict[str, float] = {}
+    for stem, n in bag.items():
+        if stem in NEGATIVE and stem in ASPECTS:
+            issue_labels[ASPECTS[stem]] = issue_labels.get(ASPECTS[stem], 0) + NEGATIVE[stem] * n
+    for stem in negated_stems:
+        # "not clean", "δεν ήταν καθαρό": αρνημένο θετικό → issue για το aspect του
+        if stem in POSITIVE and stem in ASPECTS:
+            issue_labels[ASPECTS[stem]] = issue_labels.get(ASPECTS[stem], 0) + POSITIVE[stem]
+    issues = [
+        {"label": label, "severity": min(5, 2 + int(score)), "note": "keyword match"}
+        for label, score in sorted(issue_labels.items(), key=lambda kv: -kv[1])
+    ]
+
+    aspects = []
+    for stem in bag:
+        label = ASPECTS.get(stem)
+        if stem in POSITIVE and label and label not in aspects:
+            aspects.append(label)
+
+    if sentiment == "positive":
+        summary = "Positive review" + (f" praising {', '.join(aspects)}." if aspects else ".")
+    elif sentiment == "negative":
+        summary = "Negative review" + (f" about {', '.join(i['label'] for i in issues)}." if issues else ".")
+    else:
+        summary = "Mixed review."
+
+    return {
+        "summary": summary,
+        "sentiment": sentiment,
+        "issues": issues,
+        "highlights": aspects,
+        "confidence": round(confidence, 3),
+        "negative_signals": negative_signals,
+        "unknown_share": round(unknown_share(tokens), 3),
+    }
+
+
+def analyze_local(text: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """Analysis dict (χωρίς τα extra fields) αν το fast path είναι σίγουρο, αλλιώς None → LLM."""
+    result = classify(text)
+    if (result["negative_signals"] or result["confidence"] < min_confidence
+            or result["unknown_share"] > MAX_UNKNOWN_SHARE):
+        return None
+    result.pop("confidence")
+    result.pop("negative_signals")
+    result.pop("unknown_share")
+    return result
+
+
+def produced_locally(analysis: Dict[str, Any]) -> bool:
+    """True αν ένα αποθηκευμένο analysis (π.χ. history row) βγήκε από το fast path και όχι από το LLM."""
+    return analysis.get("sentiment") == "positive" and bool(_LOCAL_SUMMARY.fullmatch(analysis.get("summary") or ""))
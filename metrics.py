@@ -0,0 +1,134 @@
+"""
+Lightweight tracing για κάθε LLM call (utils) και κάθε db operation.
+
+Κάθε span γίνεται ένα tuple σε in-memory buffer (~1 µs)· το buffer γράφεται
+στο db.metrics με ένα executemany όταν γεμίσει ή περάσει FLUSH_INTERVAL_S,
+και στο exit του process. Το property του span έρχεται από το thread-local
+context (set_context / context), ώστε να μη χρειάζεται να περνάει παντού.
+"""
+import atexit
+import functools
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ENABLED = True
+FLUSH_ROWS = 200
+FLUSH_INTERVAL_S = 5.0
+
+# USD ανά 1M tokens: (input, cached input, output)
+PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+
+_buf: List[Tuple] = []
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_ctx = threading.local()
+
+
+def set_context(property_name: Optional[str] = None) -> None:
+    _ctx.property_name = property_name or ""
+
+
+def get_context() -> Dict[str, Any]:
+    return {"property_name": getattr(_ctx, "property_name", "")}
+
+
+@contextmanager
+def context(property_name: Optional[str] = None) -> Iterator[None]:
+    prev = get_context()
+    set_context(property_name)
+    try:
+        yield
+    finally:
+        set_context(**prev)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    price_in, price_cached, price_out = PRICES.get(model, PRICES["gpt-4o-mini"])
+    return ((prompt_tokens - cached_tokens) * price_in + cached_tokens * price_cached
+            + completion_tokens * price_out) / 1_000_000
+
+
+def record(stage: str, duration_ms: float, model: str = "", prompt_tokens: int = 0, completion_tokens: int = 0,
+           cached_tokens: int = 0, cache_hit: bool = False, ok: bool = True) -> None:
+    global _last_flush
+    if not ENABLED:
+        return
+    row = (time.time(), stage, getattr(_ctx, "property_name", ""), model, duration_ms,
+           prompt_tokens, completion_tokens, cached_tokens, int(cache_hit), int(ok))
+    with _lock:
+        _buf.append(row)
+        due = len(_buf) >= FLUSH_ROWS or time.monotonic() - _last_flush >= FLUSH_INTERVAL_S
+    if due:
+        flush()
+
+
+def flush() -> None:
+    """Γράφει ό,τι είναι στο buffer· αν το thread έχει ανοιχτό transaction, περιμένει το επόμενο record."""
+    global _last_flush
+    import db
+
+    if not _buf:
+        return  # π.χ. στο exit ενός process που δεν άγγιξε ποτέ τη DB: μην ανοίξεις connection
+    try:
+        if db.get_conn().in_transaction:
+            return
+        with _lock:
+            rows = _buf[:]
+            del _buf[:]
+            _last_flush = time.monotonic()
+        db.metrics_write_many(rows)
+    except sqlite3.Error:
+        pass  # π.χ. DB χωρίς init_db ή σβησμένη temp DB· τα metrics δεν πρέπει ποτέ να ρίξουν το app
+
+
+atexit.register(flush)
+
+
+@contextmanager
+def span(stage: str, model: str = "") -> Iterator[Dict[str, Any]]:
+    """
+    Times the block and records it on exit. The caller fills in the yielded dict:
+    prompt_tokens / completion_tokens / cached_tokens, cache_hit.
+    """
+    rec: Dict[str, Any] = {}
+    ok = True
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception:
+        ok = False
+        raise
+    finally:
+        record(stage, (time.perf_counter() - t0) * 1000, model=model, ok=ok,
+               prompt_tokens=rec.get("prompt_tokens", 0), completion_tokens=rec.get("completion_tokens", 0),
+               cached_tokens=rec.get("cached_tokens", 0), cache_hit=rec.get("cache_hit", False))
+
+
+def traced(stage: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: κάθε κλήση γίνεται span με όνομα `stage` (default "<module>.<function>")."""
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = stage or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            ok = True
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                ok = False
+                raise
+            finally:
+                record(name, (time.perf_counter() - t0) * 1000, ok=ok)
+        return wrapper
+    return deco
@@ -6,20 +6,23 @@ from auth import require_login, show_logout_button
 require_login("Host Reply Pro")
 show_logout_button()
 import json
+import time
 from datetime import datetime, timezone
 
 import streamlit as st
 
-from db import init_db, add_history, list_properties, kv_get
-from utils import get_client_from_secrets, detect_language, analyze_review, build_reply_prompt, generate_text
+import metrics
+from db import init_db, add_history, property_names, get_property, kv_snapshot, find_near_duplicates
+from utils import get_client_from_secrets, run_reply_pipeline, generate_text_stream, generate_candidates, last_usage
 
 init_db()
 client = get_client_from_secrets(st)
 
-# ---- Load settings (persistent) ----
+# ---- Load settings (persistent, ένα query + in-process cache) ----
+SETTINGS = kv_snapshot()
+
 def get_setting(key: str, default: str) -> str:
-    v = kv_get(key)
-    return v if v is not None else default
+    return SETTINGS.get(key, default)
 
 MODEL = get_setting("model", "gpt-4o-mini")
 TEMP = float(get_setting("temperature", "0.6"))
@@ -33,8 +36,8 @@ st.set_page_config(page_title="Review Generator", page_icon="✍️", layout="wi
 st.title("✍️ Review Generator")
 st.caption("Paste review → Analyze → Premium reply. (GPT)")
 
-props = list_properties()
-prop_names = ["(No property)"] + [p["name"] for p in props]
+# in-process cache (invalidated από upsert/delete_property): κανένα DB read σε κάθε rerun
+prop_names = ["(No property)"] + property_names()
 default_prop_index = 0
 if DEFAULT_PROPERTY and DEFAULT_PROPERTY in prop_names:
     default_prop_index = prop_names.index(DEFAULT_PROPERTY)
@@ -52,10 +55,15 @@ with c3:
     length = st.selectbox("Reply length", ["Short", "Normal", "Premium"],
                           index=["Short","Normal","Premium"].index(DEFAULT_LENGTH))
 
-if AUTO_LANG:
-    lang_mode = st.selectbox("Language", ["Auto (detect)", "English", "Greek"], index=0)
-else:
-    lang_mode = st.selectbox("Language", ["English", "Greek"], index=0)
+l1, l2 = st.columns([1, 1])
+with l1:
+    if AUTO_LANG:
+        lang_mode = st.selectbox("Language", ["Auto (detect)", "English", "Greek"], index=0)
+    else:
+        lang_mode = st.selectbox("Language", ["English", "Greek"], index=0)
+with l2:
+    n_candidates = st.selectbox("Alternatives", [1, 2, 3], index=0,
+                                help="Πολλές εκδοχές του reply από ένα μόνο request.")
 
 review = st.text_area("📝 Paste guest review here", height=220, placeholder="Paste the guest review text here...")
 
@@ -66,15 +74,17 @@ with colB:
     clear = st.button("🧹 Clear")
 
 if clear:
+    st.session_state.pop("dup_pending", None)
+    st.session_state.pop("candidates", None)
     st.rerun()
 
+# tracing: όλα τα LLM / db spans αυτού του rerun μετράνε στο επιλεγμένο property
+metrics.set_context("" if property_name == "(No property)" else property_name)
+
 def get_selected_property():
     if property_name == "(No property)":
         return None
-    for p in props:
-        if p["name"] == property_name:
-            return p
-    return None
+    return get_property(property_name)
 
 # --- Copy button (JS) ---
 def copy_button(text: str):
@@ -92,29 +102,7 @@ def copy_button(text: str):
         height=55
     )
 
-if go:
-    if not review.strip():
-        st.warning("Κάνε paste ένα review πρώτα.")
-        st.stop()
-
-    with st.spinner("Analyzing..."):
-        # Language
-        if lang_mode == "Auto (detect)":
-            detected = detect_language(client, MODEL, review)
-            language = "Greek" if detected == "Greek" else "English"
-        else:
-            language = lang_mode
-
-        analysis = analyze_review(client, MODEL, review)
-
-    with st.spinner("Generating reply..."):
-        prop = get_selected_property()
-        prompt = build_reply_prompt(platform, tone, language, length, analysis, review, prop)
-        reply = generate_text(client, MODEL, TEMP, prompt)
-
-    st.success("Done ✅")
-
-    # ---- Show analysis ----
+def show_analysis(analysis, language):
     st.subheader("📊 Analysis")
     c1, c2 = st.columns([2, 1])
     with c1:
@@ -133,30 +121,142 @@ if go:
     else:
         st.write("**Issues detected:** — (fully positive / no clear issues)")
 
-    # ---- Reply ----
-    st.subheader("✉️ Suggested Host Reply")
-    copy_button(reply)
-    st.text_area("Reply", reply, height=170)
-    st.code(reply)
-
-    st.download_button("⬇️ Download reply.txt", reply, file_name="host_reply.txt")
-
-    # Save to DB history
-    add_history({
+def history_row(analysis, language, reply, settings):
+    return {
         "created_at": datetime.now(timezone.utc).isoformat(),
-        "property_name": "" if property_name == "(No property)" else property_name,
-        "platform": platform,
-        "tone": tone,
+        "property_name": "" if settings["property_name"] == "(No property)" else settings["property_name"],
+        "platform": settings["platform"],
+        "tone": settings["tone"],
         "language": language,
-        "length": length,
+        "length": settings["length"],
         "sentiment": analysis.get("sentiment", "mixed"),
-        "issues_json": json.dumps(issues, ensure_ascii=False),
+        "issues_json": json.dumps(analysis.get("issues", []), ensure_ascii=False),
         "summary": analysis.get("summary", ""),
         "highlights_json": json.dumps(analysis.get("highlights", []), ensure_ascii=False),
         "review": review,
         "reply": reply,
-    })
+    }
+
+def show_timings(timings, usage):
+    with st.expander("⏱️ Timings"):
+        st.write({k: f"{v:.0f} ms" for k, v in timings.items()})
+        if usage:
+            st.caption(f"Reply tokens: prompt {usage['prompt_tokens']} "
+                       f"(cached {usage['cached_tokens']}) • completion {usage['completion_tokens']}")
+        else:
+            st.caption("Reply served from cache (no API call).")
+
+def show_reply_actions(reply):
+    copy_button(reply)
+    st.code(reply)
+    st.download_button("⬇️ Download reply.txt", reply, file_name="host_reply.txt")
+
+if go:
+    if not review.strip():
+        st.warning("Κάνε paste ένα review πρώτα.")
+        st.stop()
+    # Near-duplicate (π.χ. ίδιο review σε Airbnb + Booking) → πρόταση για reuse
+    dups = find_near_duplicates(review)
+    if dups:
+        st.session_state["dup_pending"] = {"review": review, "match": dups[0]}
+    else:
+        st.session_state.pop("dup_pending", None)
+
+run_new = go and "dup_pending" not in st.session_state
+pending = st.session_state.get("dup_pending")
+if pending and pending["review"] == review:
+    m = pending["match"]
+    st.info(f"♻️ Πολύ παρόμοιο με το #{m['id']} ({m['similarity']:.0%} similar • "
+            f"{m['created_at'][:10]} • {m['platform']} • {m.get('property_name') or '—'}).")
+    cR, cN = st.columns([1, 1])
+    with cR:
+        reuse = st.button("♻️ Reuse stored analysis & reply")
+    with cN:
+        regenerate = st.button("✨ Generate new anyway")
+
+    if reuse:
+        st.session_state.pop("dup_pending", None)
+        show_analysis({
+            "summary": m["summary"],
+            "sentiment": m["sentiment"],
+            "issues": json.loads(m["issues_json"]) if m.get("issues_json") else [],
+            "highlights": json.loads(m["highlights_json"]) if m.get("highlights_json") else [],
+        }, m["language"])
+        st.subheader("✉️ Suggested Host Reply")
+        st.text_area("Reply", m["reply"], height=170)
+        st.success(f"Reused from #{m['id']} ✅ (no API calls)")
+        show_reply_actions(m["reply"])
+        st.stop()
+    if regenerate:
+        st.session_state.pop("dup_pending", None)
+        run_new = True
+    if not run_new:
+        st.stop()
+
+if run_new:
+    with st.spinner("Analyzing..."):
+        # language (local) ∥ analysis (ένα LLM call) → prompt
+        result = run_reply_pipeline(client, MODEL, review, platform, tone, length,
+                                    lang_mode, get_selected_property())
+        analysis = result["analysis"]
+        language = result["language"]
+        timings = result["timings"]
+
+    # ---- Show analysis ----
+    show_analysis(analysis, language)
+    settings = {"property_name": property_name, "platform": platform, "tone": tone, "length": length}
+
+    st.subheader("✉️ Suggested Host Reply")
+    t_gen = time.perf_counter()
+    if n_candidates == 1:
+        # ---- Reply (streamed) ----
+        reply_box = st.empty()
+        with reply_box.container():
+            reply = st.write_stream(
+                generate_text_stream(client, MODEL, TEMP, result["prompt"], system=result["system"])
+            ).strip()
+        timings["generate"] = (time.perf_counter() - t_gen) * 1000
+        usage = last_usage()
+        # Όταν τελειώσει το stream: editable text + copy/download + save
+        reply_box.text_area("Reply", reply, height=170)
+        st.success("Done ✅")
+        show_reply_actions(reply)
+        show_timings(timings, usage)
+
+        # Save to DB history
+        add_history(history_row(analysis, language, reply, settings))
+        st.stop()
 
+    # ---- N alternatives από ένα request → ο host διαλέγει ----
+    with st.spinner(f"Generating {n_candidates} alternatives..."):
+        replies = generate_candidates(client, MODEL, TEMP, result["prompt"], n=n_candidates,
+                                      system=result["system"])
+    timings["generate"] = (time.perf_counter() - t_gen) * 1000
+    show_timings(timings, last_usage())
+    for i in range(3):
+        st.session_state.pop(f"cand_{i}", None)  # καθάρισε τα text_areas της προηγούμενης γενιάς
+    st.session_state["candidates"] = {
+        "review": review, "analysis": analysis, "language": language,
+        "replies": replies, "settings": settings,
+    }
 
+cand = st.session_state.get("candidates")
+if cand and cand["review"] == review:
+    if not run_new:
+        show_analysis(cand["analysis"], cand["language"])
+        st.subheader("✉️ Suggested Host Reply")
 
+    st.caption("Διάλεξε μία εκδοχή· μόνο αυτή αποθηκεύεται στο history.")
+    chosen = None
+    cols = st.columns(len(cand["replies"]))
+    for i, (col, text) in enumerate(zip(cols, cand["replies"])):
+        with col:
+            edited = st.text_area(f"Option {i + 1}", text, height=220, key=f"cand_{i}")
+            if st.button("✅ Use this", key=f"use_cand_{i}"):
+                chosen = edited.strip()
 
+    if chosen is not None:
+        add_history(history_row(cand["analysis"], cand["language"], chosen, cand["settings"]))
+        st.session_state.pop("candidates", None)
+        st.success("Saved ✅")
+        show_reply_actions(chosen)
@@ -6,9 +6,17 @@ from auth import require_login, show_logout_button
 require_login("Host Reply Pro")
 show_logout_button()
 import json
+import os
+import tempfile
+from datetime import timedelta
+
 import streamlit as st
 
-from db import init_db, list_history, clear_history
+from db import (
+    init_db, query_history, list_history_properties, search_history, clear_history,
+    export_history, import_history, read_history_file, EXPORT_FORMATS, ARCHIVE_AFTER_DAYS,
+)
+from utils import ISSUE_LABELS
 
 init_db()
 
@@ -16,15 +24,112 @@ st.set_page_config(page_title="History", page_icon="🕘", layout="wide")
 st.title("🕘 History")
 st.caption("Ό,τι έφτιαξες αποθηκεύεται μόνιμα εδώ (SQLite).")
 
-top = st.columns([1, 1, 2])
+search = st.text_input("🔎 Search reviews & replies", placeholder="e.g. AC, parking, breakfast…")
+if search.strip():
+    results = search_history(search, limit=50)
+    if not results:
+        st.info("Κανένα αποτέλεσμα.")
+    for r in results:
+        prop = r.get("property_name") or "—"
+        archived = " • 🗄️ archived" if r.get("archived") else ""
+        st.markdown(f"**#{r['id']}** • {r['created_at'][:19]} • {r['platform']} • {r['sentiment']} • {prop}{archived}")
+        st.markdown(f"> {r['review_snippet']}")
+        st.caption(f"Reply: {r['reply_snippet']}")
+    st.stop()
+
+ALL = "(All)"
+
+f = st.columns([1.2, 1, 1, 1, 1.4, 1])
+with f[0]:
+    f_prop = st.selectbox("Property", [ALL] + [p or "(No property)" for p in list_history_properties()])
+with f[1]:
+    f_sentiment = st.selectbox("Sentiment", [ALL, "positive", "mixed", "negative"])
+with f[2]:
+    f_platform = st.selectbox("Platform", [ALL, "Airbnb", "Booking.com", "Other"])
+with f[3]:
+    f_issue = st.selectbox("Issue", [ALL] + ISSUE_LABELS)
+with f[4]:
+    f_dates = st.date_input("Date range", value=(), format="YYYY-MM-DD")
+with f[5]:
+    f_archived = st.toggle("Include archived", value=True,
+                           help=f"Rows παλαιότερα από {ARCHIVE_AFTER_DAYS} μέρες μετακινούνται compressed στο archive.")
+
+top = st.columns([1, 1, 1, 1])
 with top[0]:
-    limit = st.selectbox("Show last", [10, 20, 50, 100], index=2)
-with top[1]:
+    limit = st.selectbox("Per page", [10, 20, 50, 100], index=2)
+with top[3]:
     if st.button("🗑️ Clear ALL history", type="secondary"):
         clear_history()
+        st.session_state.pop("hist_cursors", None)
         st.rerun()
 
-items = list_history(limit=limit)
+filters = {
+    "property_name": None if f_prop == ALL else ("" if f_prop == "(No property)" else f_prop),
+    "sentiment": None if f_sentiment == ALL else f_sentiment,
+    "platform": None if f_platform == ALL else f_platform,
+    "issue_label": None if f_issue == ALL else f_issue,
+    "date_from": f_dates[0].isoformat() if len(f_dates) >= 1 else None,
+    "date_to": (f_dates[-1] + timedelta(days=1)).isoformat() if len(f_dates) >= 1 else None,
+}
+
+with st.expander("⬇️ Export / ⬆️ Import"):
+    e1, e2 = st.columns([1, 1])
+    with e1:
+        exp_fmt = st.selectbox("Export format", EXPORT_FORMATS, help="Εξάγει ό,τι ταιριάζει με τα φίλτρα (και τα archived rows, αν είναι ενεργό το toggle).")
+        if st.button("📦 Prepare export"):
+            # γράφεται chunk-by-chunk σε temp file, όχι σε ένα μεγάλο string στη μνήμη
+            fd, path = tempfile.mkstemp(suffix=f".{exp_fmt}")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    for chunk in export_history(exp_fmt, include_archive=f_archived, **filters):
+                        out.write(chunk)
+            except ImportError as e:
+                os.remove(path)
+                st.error(str(e))
+            else:
+                old_path = st.session_state.get("hist_export", {}).get("path")
+                if old_path and os.path.exists(old_path):
+                    os.remove(old_path)
+                st.session_state["hist_export"] = {"path": path, "fmt": exp_fmt}
+        exp = st.session_state.get("hist_export")
+        if exp and os.path.exists(exp["path"]):
+            with open(exp["path"], "rb") as fh:
+                st.download_button(f"⬇️ Download history.{exp['fmt']}", fh, file_name=f"history.{exp['fmt']}")
+    with e2:
+        up = st.file_uploader("Import file", type=list(EXPORT_FORMATS) + ["ndjson"])
+        if up is not None and st.button("⬆️ Import"):
+            fmt = "jsonl" if up.name.lower().endswith(".ndjson") else up.name.rsplit(".", 1)[-1].lower()
+            try:
+                with st.spinner("Importing..."):
+                    res = import_history(read_history_file(up, fmt))
+            except (ImportError, ValueError) as e:
+                st.error(str(e))
+            else:
+                st.success(f"Imported {res['imported']} • skipped {res['skipped']} duplicates"
+                           + (f" • {res['invalid']} rows without review" if res["invalid"] else ""))
+                st.session_state.pop("hist_cursors", None)
+                st.session_state.pop("hist_filters_key", None)
+
+# Keyset pagination: κρατάμε στο session τη στοίβα από cursors (created_at, id) των σελίδων
+filters_key = json.dumps([filters, limit, f_archived], sort_keys=True)
+if st.session_state.get("hist_filters_key") != filters_key:
+    st.session_state["hist_filters_key"] = filters_key
+    st.session_state["hist_cursors"] = [None]
+cursors = st.session_state["hist_cursors"]
+
+items, next_cursor = query_history(**filters, before=cursors[-1], limit=limit, include_archive=f_archived)
+
+with top[1]:
+    if st.button("⬅️ Newer", disabled=len(cursors) <= 1):
+        cursors.pop()
+        st.rerun()
+with top[2]:
+    if st.button("Older ➡️", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+st.caption(f"Page {len(cursors)}")
+if not f_archived:
+    st.caption(f"🗄️ Τα archived rows (παλαιότερα από {ARCHIVE_AFTER_DAYS} μέρες) δεν εμφανίζονται.")
 
 if not items:
     st.info("Δεν υπάρχει ιστορικό ακόμα. Πήγαινε στο Review Generator.")
@@ -34,8 +139,9 @@ for it in items:
     issues = json.loads(it["issues_json"]) if it.get("issues_json") else []
     highlights = json.loads(it["highlights_json"]) if it.get("highlights_json") else []
     prop = it.get("property_name") or "—"
+    archived = " • 🗄️ archived" if it.get("archived") else ""
 
-    with st.expander(f"#{it['id']} • {it['created_at'][:19]} • {it['platform']} • {it['sentiment']} • {prop}"):
+    with st.expander(f"#{it['id']} • {it['created_at'][:19]} • {it['platform']} • {it['sentiment']} • {prop}{archived}"):
         st.write("**Tone:**", it["tone"])
         st.write("**Language:**", it["language"])
         st.write("**Length:**", it["length"])
@@ -3,16 +3,20 @@ require_login("Host Reply Pro")
 
 
 import streamlit as st
-from db import init_db, kv_set, kv_get
+from db import (
+    init_db, kv_set_many, kv_snapshot, llm_cache_stats, llm_cache_clear,
+    archive_stats, archive_history, compact_history, backfill_signatures, ARCHIVE_AFTER_DAYS,
+)
 
 init_db()
 
 st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
 st.title("⚙️ Settings")
 
+SETTINGS = kv_snapshot()
+
 def get_setting(key: str, default: str) -> str:
-    v = kv_get(key)
-    return v if v is not None else default
+    return SETTINGS.get(key, default)
 
 model = st.selectbox("Model", ["gpt-4o-mini"], index=0)
 
@@ -32,13 +36,58 @@ auto_language = st.toggle("Auto language detect (recommended)", value=(get_setti
 default_property = st.text_input("Default property name (optional)", value=get_setting("default_property", ""))
 
 if st.button("💾 Save settings", type="primary"):
-    kv_set("model", model)
-    kv_set("temperature", str(temperature))
-    kv_set("default_platform", default_platform)
-    kv_set("default_tone", default_tone)
-    kv_set("default_length", default_length)
-    kv_set("auto_language", "1" if auto_language else "0")
-    kv_set("default_property", default_property.strip())
+    kv_set_many({
+        "model": model,
+        "temperature": str(temperature),
+        "default_platform": default_platform,
+        "default_tone": default_tone,
+        "default_length": default_length,
+        "auto_language": "1" if auto_language else "0",
+        "default_property": default_property.strip(),
+    })
     st.success("Saved ✅ (persistent)")
 
 st.info("Tip: Τα settings πλέον σώζονται μόνιμα (SQLite).")
+
+st.divider()
+st.subheader("⚡ LLM response cache")
+stats = llm_cache_stats()
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Entries", stats["entries"])
+m2.metric("Size", f"{stats['bytes'] / 1024:.1f} KB")
+m3.metric("Hits", stats["hits"])
+m4.metric("Misses", stats["misses"])
+if st.button("🧹 Clear cache", type="secondary"):
+    llm_cache_clear()
+    st.rerun()
+
+st.divider()
+st.subheader("🗄️ Storage (archive)")
+st.caption("Παλιά rows μετακινούνται σε compressed archive· μένουν στο History (toggle «Include archived»), "
+           "στο search, στα analytics, στο export και στο PDF Export (λίστα «Archived»).")
+a = archive_stats()
+s1, s2, s3, s4 = st.columns(4)
+s1.metric("Archived rows", a["rows"])
+s2.metric("Saved", f"{a['saved_bytes'] / 1024 / 1024:.1f} MB")
+s3.metric("Ratio", f"{a['ratio']}×" if a["ratio"] else "—")
+s4.metric("DB file", f"{a['file_bytes'] / 1024 / 1024:.1f} MB")
+archive_days = st.number_input("Archive rows older than (days)", min_value=1, value=ARCHIVE_AFTER_DAYS, step=1)
+b1, b2, b3 = st.columns(3)
+with b1:
+    if st.button("📦 Archive now"):
+        with st.spinner("Archiving..."):
+            res = archive_history(older_than_days=int(archive_days))
+        st.success(f"Archived {res['archived']} rows "
+                   f"({res['raw_bytes'] / 1024:.0f} KB → {res['stored_bytes'] / 1024:.0f} KB)")
+with b2:
+    if st.button("🧱 Compact (recompress + VACUUM)"):
+        with st.spinner("Compacting..."):
+            res = compact_history()
+        st.success(f"DB file {res['file_bytes_before'] / 1024 / 1024:.1f} MB → "
+                   f"{res['file_bytes_after'] / 1024 / 1024:.1f} MB")
+with b3:
+    if st.button("🧬 Backfill duplicate signatures",
+                 help="Near-duplicate signatures για παλιά rows (κάθε άνοιγμα σελίδας κάνει μόνο λίγα)."):
+        with st.spinner("Backfilling..."):
+            n = backfill_signatures()
+        st.success(f"Signatures για {n} rows")
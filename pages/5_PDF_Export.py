@@ -1,17 +1,14 @@
 from auth import require_login, show_logout_button
 require_login("Host Reply Pro")
 
-import json
-import io
 import os
-import streamlit as st
+import tempfile
+from datetime import timedelta
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import streamlit as st
 
-from db import init_db, list_history, get_history_item
+from db import init_db, list_history, list_archived_history, get_history_item, iter_history, count_history, list_history_properties
+from pdf_report import ensure_fonts, make_pdf, write_report, write_pdf_zip
 
 
 # ---------------------------
@@ -21,189 +18,124 @@ init_db()
 
 st.set_page_config(page_title="PDF Export", page_icon="📄", layout="wide")
 st.title("📄 PDF Export")
-st.caption("Διάλεξε ένα history item και κατέβασέ το σαν PDF report.")
+st.caption("Ένα history item σαν PDF, ή owner report με όλα τα reviews ανά property και μήνα.")
 
 
 # ---------------------------
 # Fonts (Greek/Unicode safe)
 # ---------------------------
-FONT_REGULAR_NAME = "DejaVu"
-FONT_BOLD_NAME = "DejaVu-Bold"
-
-FONT_REGULAR_PATH = os.path.join("assets", "fonts", "DejaVuSans.ttf")
-FONT_BOLD_PATH = os.path.join("assets", "fonts", "DejaVuSans-Bold.ttf")  # optional
+try:
+    ensure_fonts()
+except FileNotFoundError:
+    st.error(
+        "Λείπει font για ελληνικά.\n\n"
+        "Βάλε στο repo: assets/fonts/DejaVuSans.ttf\n"
+        "(και προαιρετικά: assets/fonts/DejaVuSans-Bold.ttf)"
+    )
+    st.stop()
 
 
-def ensure_fonts():
-    # Regular REQUIRED
-    if FONT_REGULAR_NAME not in pdfmetrics.getRegisteredFontNames():
-        if not os.path.exists(FONT_REGULAR_PATH):
-            st.error(
-                "Λείπει font για ελληνικά.\n\n"
-                "Βάλε στο repo: assets/fonts/DejaVuSans.ttf\n"
-                "(και προαιρετικά: assets/fonts/DejaVuSans-Bold.ttf)"
+mode = st.radio("Mode", ["Single item", "Multi-item report", "Batch ZIP (one PDF per item)"], horizontal=True)
+
+
+def keep_download(key: str, path: str) -> None:
+    # ένα αρχείο ανά mode στο session· το προηγούμενο σβήνεται
+    old_path = st.session_state.get(key)
+    if old_path and old_path != path and os.path.exists(old_path):
+        os.remove(old_path)
+    st.session_state[key] = path
+
+
+if mode != "Single item":
+    ALL = "(All properties)"
+    r1, r2 = st.columns([1, 1])
+    with r1:
+        r_prop = st.selectbox("Property", [ALL] + [p or "(No property)" for p in list_history_properties()])
+    with r2:
+        r_dates = st.date_input("Date range", value=(), format="YYYY-MM-DD")
+    filters = {
+        "property_name": None if r_prop == ALL else ("" if r_prop == "(No property)" else r_prop),
+        "date_from": r_dates[0].isoformat() if len(r_dates) >= 1 else None,
+        "date_to": (r_dates[-1] + timedelta(days=1)).isoformat() if len(r_dates) >= 1 else None,
+    }
+
+if mode == "Multi-item report":
+    if st.button("📚 Build report", type="primary"):
+        # γράφεται κατευθείαν σε temp file· τα rows έρχονται σε chunks από τη DB (και από το archive)
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        span = " → ".join(d.isoformat() for d in r_dates) if r_dates else "all dates"
+        with st.spinner("Building report..."):
+            stats = write_report(
+                path,
+                lambda: iter_history(order_by="property", include_archive=True, **filters),
+                subtitle=f"{r_prop} • {span}",
             )
-            st.stop()
-        pdfmetrics.registerFont(TTFont(FONT_REGULAR_NAME, FONT_REGULAR_PATH))
-
-    # Bold OPTIONAL
-    if FONT_BOLD_NAME not in pdfmetrics.getRegisteredFontNames():
-        if os.path.exists(FONT_BOLD_PATH):
-            pdfmetrics.registerFont(TTFont(FONT_BOLD_NAME, FONT_BOLD_PATH))
-
+        keep_download("report_path", path)
+        st.success(f"Ready ✅ {stats['items']} reviews • {stats['pages']} pages")
+    path = st.session_state.get("report_path")
+    if path and os.path.exists(path):
+        with open(path, "rb") as fh:
+            st.download_button("⬇️ Download owner report", fh, file_name="owner_report.pdf", mime="application/pdf")
+    st.stop()
 
-ensure_fonts()
+if mode == "Batch ZIP (one PDF per item)":
+    total = count_history(include_archive=True, **filters)
+    st.caption(f"{total} items • rendering σε {os.cpu_count() or 1} processes")
+    if st.button("🗜️ Build ZIP", type="primary", disabled=total == 0):
+        fd, path = tempfile.mkstemp(suffix=".zip")
+        os.close(fd)
+        bar = st.progress(0.0, text="Rendering...")
+        stats = write_pdf_zip(
+            path,
+            iter_history(include_archive=True, **filters),
+            # το total μετρήθηκε πριν το click· rows που προστέθηκαν μετά δεν πρέπει να ρίξουν το bar (> 1.0)
+            on_progress=lambda done: bar.progress(min(1.0, done / total), text=f"{done}/{max(done, total)} PDFs"),
+        )
+        keep_download("zip_path", path)
+        st.success(f"Ready ✅ {stats['files']} PDFs in {stats['seconds']:.1f}s "
+                   f"({stats['files'] / max(stats['seconds'], 0.001):.0f}/s, {stats['workers']} workers)")
+    path = st.session_state.get("zip_path")
+    if path and os.path.exists(path):
+        with open(path, "rb") as fh:
+            st.download_button("⬇️ Download ZIP", fh, file_name="review_reports.zip", mime="application/zip")
+    st.stop()
 
 
 # ---------------------------
 # Load history
 # ---------------------------
-items = list_history(limit=100)
+source = st.radio("Items", ["Recent", "🗄️ Archived"], horizontal=True,
+                  help="Τα archived rows είναι παλαιότερα από τα hot, οπότε έχουν δική τους λίστα.")
+items = list_archived_history(limit=100) if source != "Recent" else list_history(limit=100, include_archive=True)
 if not items:
-    st.info("Δεν υπάρχει ιστορικό ακόμα.")
+    st.info("Δεν υπάρχουν archived items." if source != "Recent" else "Δεν υπάρχει ιστορικό ακόμα.")
     st.stop()
 
-ids = [it["id"] for it in items]
-chosen_id = st.selectbox("Select history item", ids, index=0)
+labels = {
+    it["id"]: f"#{it['id']} • {it['created_at'][:10]} • {it.get('property_name') or '—'}"
+              + (" • 🗄️ archived" if it.get("archived") else "")
+    for it in items
+}
+c1, c2 = st.columns([1, 1])
+with c1:
+    chosen_id = st.selectbox("Select history item", list(labels), index=0, format_func=labels.get)
+with c2:
+    by_id = st.number_input("…or open by id", min_value=0, value=0, step=1)
+if by_id:
+    chosen_id = int(by_id)
 
 item = get_history_item(int(chosen_id))
 if not item:
     st.error("Δεν βρέθηκε.")
     st.stop()
 
-issues = json.loads(item["issues_json"]) if item.get("issues_json") else []
-highlights = json.loads(item["highlights_json"]) if item.get("highlights_json") else []
-
-
-# ---------------------------
-# Helpers
-# ---------------------------
-def wrap_to_width(text: str, font_name: str, font_size: int, max_width: float):
-    """
-    Wrap lines based on rendered width (points), not character count.
-    Preserves newlines.
-    """
-    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
-    out_lines = []
-
-    for paragraph in text.split("\n"):
-        if not paragraph.strip():
-            out_lines.append("")
-            continue
-
-        words = paragraph.split()
-        cur = ""
-
-        for w in words:
-            test = (cur + " " + w).strip()
-            if pdfmetrics.stringWidth(test, font_name, font_size) <= max_width:
-                cur = test
-                continue
-
-            # push current line
-            if cur:
-                out_lines.append(cur)
-
-            # if single word too long, hard-split
-            if pdfmetrics.stringWidth(w, font_name, font_size) > max_width:
-                chunk = ""
-                for ch in w:
-                    test2 = chunk + ch
-                    if pdfmetrics.stringWidth(test2, font_name, font_size) <= max_width:
-                        chunk = test2
-                    else:
-                        out_lines.append(chunk)
-                        chunk = ch
-                cur = chunk
-            else:
-                cur = w
-
-        if cur:
-            out_lines.append(cur)
-
-    return out_lines if out_lines else [""]
-
-
-def make_pdf() -> bytes:
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    w, h = A4
-
-    left, right, top, bottom = 40, 40, 40, 50
-    max_width = w - left - right
-    y = h - top
-
-    def new_page():
-        nonlocal y
-        c.showPage()
-        y = h - top
-
-    def set_font(bold: bool, size: int) -> str:
-        # Use bold font only if registered; otherwise fallback to regular
-        if bold and (FONT_BOLD_NAME in pdfmetrics.getRegisteredFontNames()):
-            c.setFont(FONT_BOLD_NAME, size)
-            return FONT_BOLD_NAME
-        c.setFont(FONT_REGULAR_NAME, size)
-        return FONT_REGULAR_NAME
-
-    def write_block(
-        text: str,
-        bold: bool = False,
-        size: int = 10,
-        dy: int = 14,
-        gap_before: int = 0,
-    ):
-        nonlocal y
-        y -= gap_before
-        font_name = set_font(bold, size)
-        lines = wrap_to_width(text, font_name, size, max_width)
-
-        for row in lines:
-            if y < bottom:
-                new_page()
-                font_name = set_font(bold, size)
-            c.drawString(left, y, row)
-            y -= dy
-
-    # ---- Content ----
-    write_block("Host Reply Pro — Review Report", bold=True, size=14, dy=18)
-    write_block(f"Created at: {item.get('created_at','-')}", gap_before=6)
-    write_block(f"Property: {item.get('property_name') or '-'}")
-    write_block(
-        f"Platform: {item.get('platform','-')} | Tone: {item.get('tone','-')} | "
-        f"Language: {item.get('language','-')} | Length: {item.get('length','-')}"
-    )
-    write_block(f"Sentiment: {item.get('sentiment','-')}", dy=16, gap_before=6)
-
-    write_block("Summary:", bold=True, size=12, dy=16, gap_before=10)
-    write_block(item.get("summary", "-") or "-")
-
-    write_block("Highlights:", bold=True, size=12, dy=16, gap_before=10)
-    write_block(", ".join(highlights) if highlights else "-")
-
-    write_block("Issues:", bold=True, size=12, dy=16, gap_before=10)
-    if issues:
-        for it2 in issues:
-            write_block(f"- {it2.get('label')} (sev {it2.get('severity')}): {it2.get('note')}")
-    else:
-        write_block("- None")
-
-    write_block("Review:", bold=True, size=12, dy=16, gap_before=12)
-    write_block(item.get("review", "") or "-")
-
-    write_block("Reply:", bold=True, size=12, dy=16, gap_before=12)
-    write_block(item.get("reply", "") or "-")
-
-    c.save()
-    buf.seek(0)
-    return buf.read()
-
 
 # ---------------------------
 # UI
 # ---------------------------
 if st.button("📄 Generate PDF", type="primary"):
-    pdf_bytes = make_pdf()
+    pdf_bytes = make_pdf(item)
     st.download_button(
         "⬇️ Download PDF report",
         data=pdf_bytes,
@@ -0,0 +1,69 @@
+from auth import require_login, show_logout_button
+require_login("Host Reply Pro")
+show_logout_button()
+
+from datetime import timedelta
+
+import streamlit as st
+
+from db import init_db, issue_stats, list_history_properties
+from utils import ISSUE_LABELS
+
+init_db()
+
+st.set_page_config(page_title="Analytics", page_icon="📊", layout="wide")
+st.title("📊 Issue Analytics")
+st.caption("Ποια θέματα επαναλαμβάνονται, πόσο σοβαρά, σε ποιο σπίτι και πότε.")
+
+ALL = "(All)"
+
+f = st.columns([1.2, 1, 1, 1, 1.4])
+with f[0]:
+    f_prop = st.selectbox("Property", [ALL] + [p or "(No property)" for p in list_history_properties()])
+with f[1]:
+    f_label = st.selectbox("Issue", [ALL] + ISSUE_LABELS)
+with f[2]:
+    min_severity = st.slider("Min severity", 1, 5, 1)
+with f[3]:
+    bucket = st.selectbox("Time bucket", ["month", "week", "quarter", "day", "year"], index=0)
+with f[4]:
+    f_dates = st.date_input("Date range", value=(), format="YYYY-MM-DD")
+
+filters = {
+    "property_name": None if f_prop == ALL else ("" if f_prop == "(No property)" else f_prop),
+    "label": None if f_label == ALL else f_label,
+    "min_severity": min_severity if min_severity > 1 else None,
+    "date_from": f_dates[0].isoformat() if len(f_dates) >= 1 else None,
+    "date_to": (f_dates[-1] + timedelta(days=1)).isoformat() if len(f_dates) >= 1 else None,
+}
+
+by_label = issue_stats(group_by=("label",), **filters)
+if not by_label:
+    st.info("Δεν υπάρχουν issues για αυτά τα φίλτρα.")
+    st.stop()
+
+total = sum(r["issues"] for r in by_label)
+m1, m2, m3 = st.columns(3)
+m1.metric("Issues", total)
+m2.metric("Top issue", by_label[0]["label"])
+m3.metric("Mean severity", f"{sum(r['mean_severity'] * r['issues'] for r in by_label) / total:.2f}")
+
+st.subheader("By issue")
+st.bar_chart({"label": [r["label"] for r in by_label], "issues": [r["issues"] for r in by_label]},
+             x="label", y="issues")
+st.dataframe(by_label, use_container_width=True, hide_index=True)
+
+st.subheader(f"Over time (per {bucket})")
+over_time = issue_stats(group_by=("label",), bucket=bucket, **filters)
+st.line_chart({
+    "bucket": [r["bucket"] for r in over_time],
+    "label": [r["label"] for r in over_time],
+    "issues": [r["issues"] for r in over_time],
+}, x="bucket", y="issues", color="label")
+
+st.subheader("By property")
+by_property = issue_stats(group_by=("property", "label"), **filters)
+st.dataframe(
+    [{**r, "property": r["property"] or "(No property)"} for r in by_property],
+    use_container_width=True, hide_index=True,
+)
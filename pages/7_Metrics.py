@@ -0,0 +1,75 @@
+from auth import require_login, show_logout_button
+require_login("Host Reply Pro")
+show_logout_button()
+
+import time
+
+import streamlit as st
+
+import metrics
+from db import init_db, metrics_summary, metrics_clear
+
+init_db()
+metrics.flush()  # ό,τι είναι ακόμα στο buffer αυτού του process
+
+st.set_page_config(page_title="Metrics", page_icon="⏱️", layout="wide")
+st.title("⏱️ Metrics")
+st.caption("Πού πάνε τα δευτερόλεπτα και τα tokens: κάθε LLM call και κάθε db operation.")
+
+WINDOWS = {"Last 24h": 1, "Last 7 days": 7, "Last 30 days": 30, "All": None}
+KINDS = {"LLM calls": "llm.", "DB operations": "db.", "All": None}
+
+f = st.columns([1, 1, 2])
+with f[0]:
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+with f[1]:
+    kind = st.selectbox("Spans", list(KINDS), index=0)
+with f[2]:
+    if st.button("🧹 Clear metrics", type="secondary"):
+        metrics_clear()
+        st.rerun()
+
+days = WINDOWS[window]
+filters = {
+    "since_ts": time.time() - days * 86400 if days else None,
+    "stage_prefix": KINDS[kind],
+}
+
+by_stage = metrics_summary(group_by=("stage",), **filters)
+if not by_stage:
+    st.info("Δεν υπάρχουν metrics ακόμα για αυτό το παράθυρο.")
+    st.stop()
+
+calls = sum(r["calls"] for r in by_stage)
+hits = sum(r["cache_hits"] for r in by_stage)
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Calls", calls)
+m2.metric("Cache hit rate", f"{hits / calls:.0%}")
+m3.metric("Tokens (prompt + completion)",
+          f"{sum(r['prompt_tokens'] + r['completion_tokens'] for r in by_stage):,}")
+m4.metric("Estimated cost", f"${sum(r['cost_usd'] for r in by_stage):.4f}")
+
+st.subheader("Per stage")
+st.bar_chart({"stage": [r["stage"] for r in by_stage], "p95_ms": [r["p95_ms"] for r in by_stage]},
+             x="stage", y="p95_ms")
+st.dataframe(by_stage, use_container_width=True, hide_index=True)
+
+st.subheader("Per day")
+by_day = metrics_summary(group_by=("day",), **filters)
+st.line_chart({
+    "day": [r["day"] for r in by_day],
+    "p50_ms": [r["p50_ms"] for r in by_day],
+    "p95_ms": [r["p95_ms"] for r in by_day],
+}, x="day", y=["p50_ms", "p95_ms"])
+st.bar_chart({
+    "day": [r["day"] for r in by_day],
+    "prompt_tokens": [r["prompt_tokens"] for r in by_day],
+    "completion_tokens": [r["completion_tokens"] for r in by_day],
+}, x="day", y=["prompt_tokens", "completion_tokens"])
+
+st.subheader("Per property")
+by_property = metrics_summary(group_by=("property", "stage"), **filters)
+st.dataframe(
+    [{**r, "property": r["property"] or "(No property)"} for r in by_property],
+    use_container_width=True, hide_index=True,
+)
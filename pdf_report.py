@@ -0,0 +1,310 @@
+"""
+PDF rendering για history items (χωρίς Streamlit, ώστε να το χρησιμοποιούν
+και το PDF Export page και τα bench scripts).
+"""
+import io
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from text_wrap import wrap_to_width
+
+
+# ---------------------------
+# Fonts (Greek/Unicode safe)
+# ---------------------------
+FONT_REGULAR_NAME = "DejaVu"
+FONT_BOLD_NAME = "DejaVu-Bold"
+
+_FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "fonts")
+FONT_REGULAR_PATH = os.path.join(_FONTS_DIR, "DejaVuSans.ttf")
+FONT_BOLD_PATH = os.path.join(_FONTS_DIR, "DejaVuSans-Bold.ttf")  # optional
+
+
+def ensure_fonts() -> None:
+    # Regular REQUIRED
+    if FONT_REGULAR_NAME not in pdfmetrics.getRegisteredFontNames():
+        if not os.path.exists(FONT_REGULAR_PATH):
+            raise FileNotFoundError(FONT_REGULAR_PATH)
+        pdfmetrics.registerFont(TTFont(FONT_REGULAR_NAME, FONT_REGULAR_PATH))
+
+    # Bold OPTIONAL
+    if FONT_BOLD_NAME not in pdfmetrics.getRegisteredFontNames():
+        if os.path.exists(FONT_BOLD_PATH):
+            pdfmetrics.registerFont(TTFont(FONT_BOLD_NAME, FONT_BOLD_PATH))
+
+
+# ---------------------------
+# Layout
+# ---------------------------
+LEFT, RIGHT, TOP, BOTTOM = 40, 40, 40, 50
+
+
+class _PageWriter:
+    """
+    Top-down text layout πάνω σε A4. Με canvas=None κάνει μόνο το layout
+    (dry run): ίδια pagination χωρίς drawing, για να ξέρουμε page numbers από πριν.
+    """
+
+    def __init__(self, c: Optional[canvas.Canvas]):
+        self.c = c
+        self.w, self.h = A4
+        self.max_width = self.w - LEFT - RIGHT
+        self.y = self.h - TOP
+        self.page = 1
+        self.bold_ok = FONT_BOLD_NAME in pdfmetrics.getRegisteredFontNames()
+
+    def new_page(self) -> None:
+        if self.c is not None:
+            self.c.showPage()
+        self.page += 1
+        self.y = self.h - TOP
+
+    def set_font(self, bold: bool, size: int) -> str:
+        # Use bold font only if registered; otherwise fallback to regular
+        name = FONT_BOLD_NAME if bold and self.bold_ok else FONT_REGULAR_NAME
+        if self.c is not None:
+            self.c.setFont(name, size)
+        return name
+
+    def ensure_space(self, height: float) -> None:
+        if self.y - height < BOTTOM:
+            self.new_page()
+
+    def write_block(self, text: str, bold: bool = False, size: int = 10, dy: int = 14, gap_before: int = 0) -> None:
+        self.y -= gap_before
+        font_name = self.set_font(bold, size)
+        lines = wrap_to_width(text, font_name, size, self.max_width)
+
+        for row in lines:
+            if self.y < BOTTOM:
+                self.new_page()
+                font_name = self.set_font(bold, size)
+            if self.c is not None:
+                self.c.drawString(LEFT, self.y, row)
+            self.y -= dy
+
+
+def make_pdf(item: Dict[str, Any]) -> bytes:
+    issues = json.loads(item["issues_json"]) if item.get("issues_json") else []
+    highlights = json.loads(item["highlights_json"]) if item.get("highlights_json") else []
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    pw = _PageWriter(c)
+    write_block = pw.write_block
+
+    # ---- Content ----
+    write_block("Host Reply Pro — Review Report", bold=True, size=14, dy=18)
+    write_block(f"Created at: {item.get('created_at','-')}", gap_before=6)
+    write_block(f"Property: {item.get('property_name') or '-'}")
+    write_block(
+        f"Platform: {item.get('platform','-')} | Tone: {item.get('tone','-')} | "
+        f"Language: {item.get('language','-')} | Length: {item.get('length','-')}"
+    )
+    write_block(f"Sentiment: {item.get('sentiment','-')}", dy=16, gap_before=6)
+
+    write_block("Summary:", bold=True, size=12, dy=16, gap_before=10)
+    write_block(item.get("summary", "-") or "-")
+
+    write_block("Highlights:", bold=True, size=12, dy=16, gap_before=10)
+    write_block(", ".join(highlights) if highlights else "-")
+
+    write_block("Issues:", bold=True, size=12, dy=16, gap_before=10)
+    if issues:
+        for it2 in issues:
+            write_block(f"- {it2.get('label')} (sev {it2.get('severity')}): {it2.get('note')}")
+    else:
+        write_block("- None")
+
+    write_block("Review:", bold=True, size=12, dy=16, gap_before=12)
+    write_block(item.get("review", "") or "-")
+
+    write_block("Reply:", bold=True, size=12, dy=16, gap_before=12)
+    write_block(item.get("reply", "") or "-")
+
+    c.save()
+    buf.seek(0)
+    return buf.read()
+
+
+# ---------------------------
+# Multi-item report (owner reports)
+# ---------------------------
+TOC_DY = 15
+
+
+def _report_item(pw: _PageWriter, item: Dict[str, Any]) -> None:
+    issues = json.loads(item["issues_json"]) if item.get("issues_json") else []
+    pw.ensure_space(60)  # header + λίγες γραμμές μαζί, όχι ορφανός τίτλος στο τέλος της σελίδας
+    pw.write_block(
+        f"#{item['id']} • {str(item.get('created_at', ''))[:10]} • {item.get('platform', '-')} • "
+        f"{item.get('sentiment', '-')}",
+        bold=True, size=10, dy=14, gap_before=8,
+    )
+    if item.get("summary"):
+        pw.write_block(f"Summary: {item['summary']}", size=9, dy=12)
+    if issues:
+        pw.write_block("Issues: " + "; ".join(f"{i.get('label')} (sev {i.get('severity')})" for i in issues),
+                       size=9, dy=12)
+    pw.write_block("Review:", bold=True, size=9, dy=12, gap_before=2)
+    pw.write_block(item.get("review", "") or "-", size=9, dy=12)
+    pw.write_block("Reply:", bold=True, size=9, dy=12, gap_before=2)
+    pw.write_block(item.get("reply", "") or "-", size=9, dy=12)
+
+
+def _layout_report(pw: _PageWriter, rows: Iterable[Dict[str, Any]], on_section=None) -> List[Dict[str, Any]]:
+    """
+    Property (νέα σελίδα) → month → items. Επιστρέφει τα sections
+    [{level, title, key, page, items}] — μόνο αυτά μένουν στη μνήμη, όχι τα rows.
+    """
+    sections: List[Dict[str, Any]] = []
+    prop = month = None
+    prop_section: Dict[str, Any] = {}
+    for item in rows:
+        p = item.get("property_name") or "(No property)"
+        m = str(item.get("created_at", ""))[:7]
+        if p != prop:
+            if prop is not None:
+                pw.new_page()
+            prop, month = p, None
+            prop_section = {"level": 0, "title": p, "key": f"s{len(sections)}", "page": pw.page, "items": 0}
+            sections.append(prop_section)
+            if on_section:
+                on_section(sections[-1])
+            pw.write_block(p, bold=True, size=16, dy=22)
+        if m != month:
+            month = m
+            pw.ensure_space(80)
+            sections.append({"level": 1, "title": m, "key": f"s{len(sections)}", "page": pw.page, "items": 0})
+            if on_section:
+                on_section(sections[-1])
+            pw.write_block(m, bold=True, size=13, dy=18, gap_before=10)
+        sections[-1]["items"] += 1
+        prop_section["items"] += 1
+        _report_item(pw, item)
+    return sections
+
+
+def _layout_toc(pw: _PageWriter, title: str, subtitle: str, sections: List[Dict[str, Any]], offset: int) -> None:
+    """Τίτλος + μία γραμμή ανά section (link στο bookmark του). Page numbers += offset."""
+    pw.write_block(title, bold=True, size=16, dy=22)
+    if subtitle:
+        pw.write_block(subtitle, size=10, dy=14)
+    pw.write_block(f"{sum(s['items'] for s in sections if s['level'] == 0)} reviews", size=10, dy=14, gap_before=2)
+    pw.y -= 10
+    for s in sections:
+        if pw.y < BOTTOM:
+            pw.new_page()
+        indent = 16 * s["level"]
+        pw.set_font(s["level"] == 0, 11 if s["level"] == 0 else 10)
+        if pw.c is not None:
+            pw.c.drawString(LEFT + indent, pw.y, f"{s['title']}  ({s['items']})")
+            pw.c.drawRightString(pw.w - RIGHT, pw.y, str(s["page"] + offset))
+            pw.c.linkRect("", s["key"], (LEFT + indent, pw.y - 3, pw.w - RIGHT, pw.y + 11), relative=0)
+        pw.y -= TOC_DY
+
+
+def write_report(
+    path: str,
+    rows: Callable[[], Iterable[Dict[str, Any]]],
+    title: str = "Host Reply Pro — Owner Report",
+    subtitle: str = "",
+) -> Dict[str, Any]:
+    """
+    Multi-item PDF (TOC + per-property / per-month sections) γραμμένο στο `path`.
+    `rows` καλείται δύο φορές και πρέπει να δίνει τα ίδια rows, ταξινομημένα ανά
+    property → created_at (π.χ. db.iter_history(order_by="property")): το πρώτο
+    πέρασμα κάνει μόνο layout για τα page numbers του TOC, το δεύτερο ζωγραφίζει.
+    Τα rows δεν κρατιούνται ποτέ όλα μαζί στη μνήμη.
+    Returns {"items", "sections", "pages"}.
+    """
+    ensure_fonts()
+    # dry runs: πρώτα το content (σελίδα κάθε section), μετά το TOC (πόσες σελίδες πιάνει)
+    sections = _layout_report(_PageWriter(None), rows())
+    toc = _PageWriter(None)
+    _layout_toc(toc, title, subtitle, sections, 0)
+    toc_pages = toc.page
+
+    c = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+    c.setTitle(title)
+    pw = _PageWriter(c)
+    _layout_toc(pw, title, subtitle, sections, toc_pages)
+    pw.new_page()
+    pw.page = 1  # ίδια αρίθμηση με το dry run
+
+    # ---- Content ----
+    def bookmark(s: Dict[str, Any]) -> None:
+        c.bookmarkPage(s["key"], fit="XYZ", top=pw.y + 20)
+        c.addOutlineEntry(s["title"], s["key"], level=s["level"])
+
+    drawn = _layout_report(pw, rows(), on_section=bookmark)
+    c.save()
+    return {"items": sum(s["items"] for s in drawn if s["level"] == 0), "sections": len(drawn),
+            "pages": toc_pages + pw.page}
+
+
+# ---------------------------
+# Batch export: process pool → ZIP
+# ---------------------------
+IN_FLIGHT_PER_WORKER = 4
+
+
+def _init_worker() -> None:
+    # κάθε worker κάνει parse τα TTF μία φορά, όχι σε κάθε PDF
+    ensure_fonts()
+
+
+def _render_one(item: Dict[str, Any]) -> Tuple[int, bytes]:
+    return item["id"], make_pdf(item)
+
+
+def write_pdf_zip(
+    path: str,
+    items: Iterable[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    One PDF per item (make_pdf) rendered in a process pool, written into a ZIP at `path`
+    as each one completes. Items are pulled lazily with a bounded in-flight window,
+    so memory does not grow with the number of items. on_progress(done) after each batch.
+    Returns {"files", "workers", "seconds"}.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    # spawn: ασφαλές και από multi-threaded process (Streamlit)· τα workers δεν κάνουν import το app
+    ctx = multiprocessing.get_context("spawn")
+    it = iter(items)
+    done = 0
+    t0 = time.perf_counter()
+    # τα PDF είναι ήδη compressed → ZIP_STORED
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        running = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(running) < workers * IN_FLIGHT_PER_WORKER:
+                item = next(it, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    running.add(pool.submit(_render_one, item))
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                item_id, pdf = fut.result()
+                zf.writestr(f"review_report_{item_id}.pdf", pdf)
+                done += 1
+            if on_progress:
+                on_progress(done)
+    return {"files": done, "workers": workers, "seconds": round(time.perf_counter() - t0, 2)}
@@ -0,0 +1,247 @@
+"""
+Rate-limit-aware scheduler για ΟΛΑ τα LLM calls (utils.call_json / generate_text / ...).
+
+- token buckets για requests/min και (εκτιμώμενα) tokens/min
+- concurrency cap
+- jittered exponential backoff που σέβεται το Retry-After (και shared cooldown μετά από 429)
+- deadline ανά request (συνολικά, μαζί με τα retries)
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_DEADLINE_S = 90.0
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_COMPLETION_TOKENS = 600
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_min / 60 per second, up to capacity (= 1 minute of budget)."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else float(rate_per_min)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float, deadline: float) -> None:
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_s = (amount - self.tokens) / self.rate
+            if time.monotonic() + wait_s > deadline:
+                raise DeadlineExceeded("Rate limit budget not available before deadline")
+            time.sleep(min(wait_s, 1.0))
+
+    def adjust(self, delta: float) -> None:
+        """Give back (delta > 0) or charge extra (delta < 0) once the real usage is known."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    # ~4 chars/token (χοντρικά, αρκεί για budgeting)
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 4 * len(messages)
+
+
+def _retry_after_s(err: Exception) -> Optional[float]:
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(err, openai.APIStatusError):
+        return err.status_code in RETRYABLE_STATUS
+    return False
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        deadline_s: float = DEFAULT_DEADLINE_S,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay_s: float = 0.5,
+        max_delay_s: float = 30.0,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.deadline_s = deadline_s
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_cooldown(self, deadline: float) -> None:
+        with self._lock:
+            until = self._cooldown_until
+        now = time.monotonic()
+        if until > now:
+            if until > deadline:
+                raise DeadlineExceeded("Provider cooldown extends past deadline")
+            time.sleep(until - now)
+
+    def _backoff_s(self, attempt: int, err: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay_s, self.base_delay_s * (2 ** attempt)))
+        retry_after = _retry_after_s(err)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            if isinstance(err, openai.RateLimitError):
+                # shared cooldown: όλα τα threads σταματούν, όχι μόνο αυτό που πήρε το 429
+                with self._lock:
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+        return delay
+
+    def call(self, fn: Callable[[float], T], est_tokens: int, deadline_s: Optional[float] = None) -> T:
+        """
+        Runs fn(timeout_s) under the rate limits, retrying retryable API errors.
+        timeout_s is the time left until the deadline (pass it to the HTTP call).
+        """
+        deadline = time.monotonic() + (deadline_s or self.deadline_s)
+        attempt = 0
+        while True:
+            self._wait_cooldown(deadline)
+            self.requests.acquire(1, deadline)
+            self.tokens.acquire(est_tokens, deadline)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Request deadline exceeded")
+            with self.slots:
+                try:
+                    return fn(remaining)
+                except Exception as e:
+                    if not _is_retryable(e) or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff_s(attempt, e)
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(f"Request deadline exceeded after {attempt + 1} attempts")
+            time.sleep(delay)
+            attempt += 1
+
+    def call_stream(self, fn: Callable[[float], Iterable[T]], est_tokens: int,
+                    deadline_s: Optional[float] = None) -> Iterator[T]:
+        """
+        Σαν το call, για streaming responses: yields τα items του fn(timeout_s) και κρατάει
+        το concurrency slot μέχρι να τελειώσει (ή να κλείσει) το stream, όχι μόνο μέχρι τα headers.
+        Retryable errors ξαναδοκιμάζονται όσο δεν έχει φτάσει κανένα item· μετά το πρώτο
+        γίνονται raise, γιατί ο caller έχει ήδη πάρει μέρος του output.
+        """
+        deadline = time.monotonic() + (deadline_s or self.deadline_s)
+        attempt = 0
+        while True:
+            self._wait_cooldown(deadline)
+            self.requests.acquire(1, deadline)
+            self.tokens.acquire(est_tokens, deadline)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Request deadline exceeded")
+            delivered = False
+            with self.slots:
+                try:
+                    stream = fn(remaining)
+                    try:
+                        for item in stream:
+                            delivered = True
+                            yield item
+                    finally:
+                        close = getattr(stream, "close", None)
+                        if close is not None:
+                            close()
+                    return
+                except Exception as e:
+                    if delivered or not _is_retryable(e) or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff_s(attempt, e)
+            if time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(f"Request deadline exceeded after {attempt + 1} attempts")
+            time.sleep(delay)
+            attempt += 1
+
+    def _chat_stream(self, client: Any, est: int, kwargs: Dict[str, Any]) -> Iterator[Any]:
+        create = lambda timeout: client.chat.completions.create(timeout=timeout, **kwargs)  # noqa: E731
+        for chunk in self.call_stream(create, est):
+            usage = getattr(chunk, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.tokens.adjust(est - usage.total_tokens)
+            yield chunk
+
+    def chat_create(self, client: Any, **kwargs: Any) -> Any:
+        """
+        client.chat.completions.create(**kwargs) through the scheduler (+ TPM correction from resp.usage).
+        With stream=True returns an iterator of chunks that holds its slot until fully consumed.
+        """
+        completion = kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+        est = estimate_tokens(kwargs.get("messages", [])) + completion * kwargs.get("n", 1)
+        if kwargs.get("stream"):
+            return self._chat_stream(client, est, kwargs)
+        resp = self.call(lambda timeout: client.chat.completions.create(timeout=timeout, **kwargs), est)
+        usage = getattr(resp, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.tokens.adjust(est - usage.total_tokens)
+        return resp
+
+
+_scheduler = RequestScheduler()
+
+
+def configure(**kwargs: Any) -> RequestScheduler:
+    """Replace the process-wide scheduler (e.g. bulk.py --rpm/--tpm)."""
+    global _scheduler
+    _scheduler = RequestScheduler(**kwargs)
+    return _scheduler
+
+
+def get_scheduler() -> RequestScheduler:
+    return _scheduler
+
+
+def chat_create(client: Any, **kwargs: Any) -> Any:
+    return _scheduler.chat_create(client, **kwargs)
@@ -0,0 +1,94 @@
+"""
+Width-based line wrapping για τα PDF (reportlab fonts), σε O(n).
+
+Κάθε χαρακτήρας μετριέται μία φορά ανά (font, size) και μπαίνει σε cache· το
+πλάτος της γραμμής χτίζεται σταδιακά (λέξη + space), αντί να ξαναμετριέται
+όλη η γραμμή σε κάθε λέξη. Λέξεις πιο φαρδιές από τη γραμμή (URLs, emails)
+σπάνε με binary search πάνω στα prefix widths τους.
+"""
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Tuple
+
+from reportlab.pdfbase import pdfmetrics
+
+# reportlab αθροίζει glyph widths σε float· μικρό περιθώριο ώστε το άθροισμα ανά χαρακτήρα
+# να δίνει τα ίδια breaks με το stringWidth ολόκληρης της γραμμής
+_EPS = 1e-9
+
+_widths: Dict[Tuple[str, float], Dict[str, float]] = {}
+
+
+def glyph_widths(font_name: str, font_size: float) -> Dict[str, float]:
+    """The (shared, growing) char → width cache for one font and size."""
+    key = (font_name, font_size)
+    cache = _widths.get(key)
+    if cache is None:
+        cache = _widths[key] = {}
+    return cache
+
+
+def _char_width(cache: Dict[str, float], ch: str, font_name: str, font_size: float) -> float:
+    w = cache.get(ch)
+    if w is None:
+        w = cache[ch] = pdfmetrics.stringWidth(ch, font_name, font_size)
+    return w
+
+
+def string_width(text: str, font_name: str, font_size: float) -> float:
+    cache = glyph_widths(font_name, font_size)
+    return sum(_char_width(cache, ch, font_name, font_size) for ch in text)
+
+
+def wrap_to_width(text: str, font_name: str, font_size: float, max_width: float) -> List[str]:
+    """
+    Wrap lines based on rendered width (points), not character count.
+    Preserves newlines; blank paragraphs become "" lines.
+    """
+    cache = glyph_widths(font_name, font_size)
+    space = _char_width(cache, " ", font_name, font_size)
+    limit = max_width + _EPS
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    out_lines: List[str] = []
+
+    for paragraph in text.split("\n"):
+        if not paragraph.strip():
+            out_lines.append("")
+            continue
+
+        cur: List[str] = []
+        cur_w = 0.0
+        for w in paragraph.split():
+            char_ws = [_char_width(cache, ch, font_name, font_size) for ch in w]
+            word_w = sum(char_ws)
+            if not cur and word_w <= limit:
+                cur, cur_w = [w], word_w
+                continue
+            if cur and cur_w + space + word_w <= limit:
+                cur.append(w)
+                cur_w += space + word_w
+                continue
+
+            # push current line
+            if cur:
+                out_lines.append(" ".join(cur))
+
+            if word_w <= limit:
+                cur, cur_w = [w], word_w
+                continue
+
+            # single word too long: hard-split, κάθε κομμάτι με binary search στα prefix widths
+            prefix = list(accumulate(char_ws))
+            start, base = 0, 0.0
+            while True:
+                end = max(bisect_right(prefix, base + limit, lo=start), start + 1)
+                if end >= len(w):
+                    break
+                out_lines.append(w[start:end])
+                start, base = end, prefix[end - 1]
+            cur, cur_w = [w[start:]], prefix[-1] - base
+
+        if cur:
+            out_lines.append(" ".join(cur))
+
+    return out_lines if out_lines else [""]
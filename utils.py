@@ -1,8 +1,24 @@
+import functools
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
+
+try:
+    import httpx2 as httpx  # νεότερα openai SDKs
+except ImportError:
+    import httpx
+
+import db
+import lang_detect
+import lexicon
+import metrics
+import scheduler
 
 
 ISSUE_LABELS = [
@@ -11,26 +27,105 @@ ISSUE_LABELS = [
 ]
 
 
+# HTTP connection pool του shared client. Το keepalive ξεπερνά το default των 5 s ώστε
+# η σύνδεση (TCP + TLS) να επιβιώνει ανάμεσα σε Streamlit reruns.
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE = 16
+HTTP_KEEPALIVE_EXPIRY_S = 60.0
+HTTP_CONNECT_TIMEOUT_S = 5.0
+HTTP_READ_TIMEOUT_S = 120.0  # το scheduler δίνει ήδη per-call timeout (deadline)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (optional: pip install h2)
+    except ImportError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=8)
+def shared_client(api_key: str, base_url: Optional[str] = None, http2: Optional[bool] = None) -> OpenAI:
+    """
+    One OpenAI client per (api_key, base_url, http2) for the whole process: Streamlit reruns,
+    sessions και bulk workers ξαναχρησιμοποιούν το ίδιο connection pool αντί για νέο handshake.
+    """
+    http_client = DefaultHttpxClient(
+        http2=_http2_available() if http2 is None else http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT_S, connect=HTTP_CONNECT_TIMEOUT_S),
+    )
+    # retries γίνονται στο scheduler (backoff + Retry-After), όχι μέσα στο SDK
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+
+
 def get_client_from_secrets(st) -> OpenAI:
     # παίρνει το key από Streamlit Secrets ή env var
     api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
     if not api_key:
         st.error('Λείπει OPENAI_API_KEY στα Secrets. (Manage app → Settings → Secrets)')
         st.stop()
-    return OpenAI(api_key=api_key)
+    return shared_client(api_key)
 
 
-def call_json(client: OpenAI, model: str, temperature: float, system: str, user: str) -> Dict[str, Any]:
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=temperature,
-        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-        response_format={"type": "json_object"},
-    )
-    return json.loads(resp.choices[0].message.content)
+# Persistent response cache (SQLite, βλ. db.llm_cache_*). Τα bench scripts το κλείνουν.
+LLM_CACHE_ENABLED = True
+
+# Local lexicon fast path για σίγουρα θετικά reviews (βλ. lexicon.analyze_local)
+LEXICON_FAST_PATH = True
+# οι γλώσσες που καλύπτει το lexicon· οτιδήποτε άλλο πάει στο LLM
+LEXICON_LANGUAGES = ("English", "Greek")
+
+
+def cache_key(model: str, temperature: float, messages: List[Dict[str, str]],
+              response_format: Optional[Dict[str, Any]] = None, n: int = 1) -> str:
+    fields = {"model": model, "temperature": temperature, "messages": messages, "response_format": response_format}
+    if n != 1:
+        fields["n"] = n
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def call_json(client: OpenAI, model: str, temperature: float, system: str, user: str,
+              stage: str = "llm.call_json") -> Dict[str, Any]:
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    response_format = {"type": "json_object"}
+    key = cache_key(model, temperature, messages, response_format)
+    with metrics.span(stage, model) as sp:
+        if LLM_CACHE_ENABLED:
+            cached = db.llm_cache_get(key)
+            if cached is not None:
+                sp["cache_hit"] = True
+                return json.loads(cached)
+
+        resp = scheduler.chat_create(
+            client,
+            model=model,
+            temperature=temperature,
+            messages=messages,
+            response_format=response_format,
+        )
+        sp.update(_usage_dict(getattr(resp, "usage", None)))
+    content = resp.choices[0].message.content
+    data = json.loads(content)
+    if LLM_CACHE_ENABLED:
+        db.llm_cache_put(key, content)
+    return data
 
 
 def detect_language(client: OpenAI, model: str, text: str) -> str:
+    # Πρώτα local detector (κανένα API call)· LLM μόνο όταν το confidence είναι χαμηλό
+    language, confidence = lang_detect.detect(text)
+    if confidence >= lang_detect.MIN_CONFIDENCE:
+        return language
+    return detect_language_llm(client, model, text)
+
+
+def detect_language_llm(client: OpenAI, model: str, text: str) -> str:
     data = call_json(
         client=client,
         model=model,
@@ -40,12 +135,30 @@ def detect_language(client: OpenAI, model: str, text: str) -> str:
 {{"language": "English" or "Greek" or "Mixed"}}.
 
 TEXT:
-{text}"""
+{text}""",
+        stage="llm.detect_language",
     )
     return data.get("language", "English")
 
 
+def local_analysis(text: str) -> Optional[Dict[str, Any]]:
+    """Το lexicon fast path (+ "language"), μόνο για σίγουρα EN / EL reviews· αλλιώς None → LLM."""
+    language, confidence = lang_detect.detect(text)
+    if language not in LEXICON_LANGUAGES or confidence < lang_detect.MIN_CONFIDENCE:
+        return None
+    local = lexicon.analyze_local(text)
+    if local is not None:
+        local["language"] = language
+    return local
+
+
 def analyze_review(client: OpenAI, model: str, text: str) -> Dict[str, Any]:
+    if LEXICON_FAST_PATH:
+        local = local_analysis(text)
+        if local is not None:
+            local.pop("language")
+            return local
+
     data = call_json(
         client=client,
         model=model,
@@ -64,7 +177,8 @@ Analyze the review and return JSON with this schema:
 
 Review:
 {text}
-"""
+""",
+        stage="llm.analyze",
     )
     data.setdefault("issues", [])
     data.setdefault("highlights", [])
@@ -73,6 +187,46 @@ Review:
     return data
 
 
+def analyze_review_fused(client: OpenAI, model: str, text: str) -> Dict[str, Any]:
+    """
+    Language detection + analysis σε ΕΝΑ call (αντί για detect_language + analyze_review).
+    Επιστρέφει το ίδιο schema με το analyze_review, συν "language".
+    """
+    if LEXICON_FAST_PATH:
+        local = local_analysis(text)
+        if local is not None:
+            return local
+
+    data = call_json(
+        client=client,
+        model=model,
+        temperature=0.2,
+        system="You are a strict JSON generator. Output valid JSON only.",
+        user=f"""
+Detect the language of the review and analyze it. Return JSON with this schema:
+{{
+  "language": "English" | "Greek" | "Mixed",
+  "summary": "1-2 sentences",
+  "sentiment": "positive" | "mixed" | "negative",
+  "issues": [
+    {{"label": one of {ISSUE_LABELS}, "severity": 1-5, "note": "short"}}
+  ],
+  "highlights": ["short bullet", "short bullet"]
+}}
+
+Review:
+{text}
+""",
+        stage="llm.analyze_fused",
+    )
+    data.setdefault("language", "English")
+    data.setdefault("issues", [])
+    data.setdefault("highlights", [])
+    data.setdefault("summary", "")
+    data.setdefault("sentiment", "mixed")
+    return data
+
+
 def length_rules(length: str) -> str:
     if length == "Short":
         return "Keep it very short: 2–4 lines max."
@@ -81,6 +235,57 @@ def length_rules(length: str) -> str:
     return "Keep it concise: 5–8 lines."
 
 
+_PROPERTY_FIELDS = ("name", "location", "description", "checkin", "checkout", "amenities", "house_rules")
+
+
+@functools.lru_cache(maxsize=256)
+def _property_block(name: str, location: str, description: str, checkin: str, checkout: str,
+                    amenities: str, house_rules: str) -> str:
+    return f"""
+Property profile (context):
+- Name: {name}
+- Location: {location}
+- Description: {description}
+- Check-in: {checkin}
+- Check-out: {checkout}
+- Amenities: {amenities}
+- House rules: {house_rules}
+""".strip()
+
+
+def format_property_block(property_profile: Optional[Dict[str, Any]]) -> str:
+    # precompiled ανά εκδοχή του profile: κάθε edit αλλάζει τα fields → νέο cache entry
+    if not property_profile:
+        return ""
+    return _property_block(*(str(property_profile.get(f, "") or "") for f in _PROPERTY_FIELDS))
+
+
+@functools.lru_cache(maxsize=256)
+def _system_prompt(property_block: str, platform: str, tone: str, length: str) -> str:
+    # σταθερό prefix ανά (property, platform, tone, length): χτίζεται μία φορά
+    return f"""
+You are a professional short-term rental host assistant.
+
+Rules:
+- Be warm and professional.
+- If issues exist: apologize once, mention a realistic corrective action, invite them back.
+- Avoid overpromising, refunds, or admissions of liability.
+- Output ONLY the final reply text (no headings, no bullets).
+
+When the request says "Crisis mode: ON":
+- Apologize once.
+- Acknowledge concern without admitting liability.
+- Mention one concrete corrective action.
+- Keep it calm, professional, reputation-protective.
+
+{property_block}
+
+Platform: {platform}
+Tone: {tone}
+Length: {length_rules(length)}
+""".strip()
+
+
 def build_reply_prompt(
     platform: str,
     tone: str,
@@ -89,46 +294,26 @@ def build_reply_prompt(
     analysis: Dict[str, Any],
     review_text: str,
     property_profile: Optional[Dict[str, Any]] = None,
-) -> str:
+) -> Dict[str, str]:
+    """
+    Returns {"system": ..., "user": ...}.
+    Το system είναι σταθερό prefix (rules, tone, property) ώστε να πιάνει το
+    prompt-prefix caching του provider· ό,τι αλλάζει ανά review μπαίνει στο user.
+    """
     issues = analysis.get("issues", [])
     sentiment = analysis.get("sentiment", "mixed")
     summary = analysis.get("summary", "")
     highlights = analysis.get("highlights", [])
 
-    prop_block = ""
-    if property_profile:
-        prop_block = f"""
-Property profile (context):
-- Name: {property_profile.get("name","")}
-- Location: {property_profile.get("location","")}
-- Description: {property_profile.get("description","")}
-- Check-in: {property_profile.get("checkin","")}
-- Check-out: {property_profile.get("checkout","")}
-- Amenities: {property_profile.get("amenities","")}
-- House rules: {property_profile.get("house_rules","")}
-""".strip()
+    system = _system_prompt(format_property_block(property_profile), platform, tone, length)
 
-    crisis_mode = ""
     # Auto crisis mode when negative OR serious issues
     severe = any(int(i.get("severity", 3)) >= 4 for i in issues)
-    if sentiment == "negative" or severe:
-        crisis_mode = """
-Crisis mode ON:
-- Apologize once.
-- Acknowledge concern without admitting liability.
-- Mention one concrete corrective action.
-- Keep it calm, professional, reputation-protective.
-""".strip()
+    crisis_mode = "ON" if sentiment == "negative" or severe else "OFF"
 
-    return f"""
-You are a professional short-term rental host assistant.
-
-Platform: {platform}
-Tone: {tone}
+    user = f"""
 Language: {language}
-
-Guest review (raw):
-{review_text}
+Crisis mode: {crisis_mode}
 
 Analysis:
 - Sentiment: {sentiment}
@@ -136,23 +321,228 @@ Analysis:
 - Highlights: {highlights}
 - Issues: {issues}
 
-{prop_block}
+Guest review (raw):
+{review_text}
+""".strip()
 
-Rules:
-- {length_rules(length)}
-- Be warm and professional.
-- If issues exist: apologize once, mention a realistic corrective action, invite them back.
-- Avoid overpromising, refunds, or admissions of liability.
-- Output ONLY the final reply text (no headings, no bullets).
+    return {"system": system, "user": user}
 
-{crisis_mode}
-""".strip()
 
+# ---------------------------
+# Pipeline: μικρό stage graph, τα ανεξάρτητα stages τρέχουν παράλληλα
+# ---------------------------
+Stage = Tuple[Callable[..., Any], Tuple[str, ...]]
 
-def generate_text(client: OpenAI, model: str, temperature: float, prompt: str) -> str:
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=temperature,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    return resp.choices[0].message.content.strip()
+
+def _timed(fn: Callable[..., Any], kwargs: Dict[str, Any], ctx: Dict[str, Any]) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    with metrics.context(**ctx):  # το tracing context του caller και στα worker threads
+        out = fn(**kwargs)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def run_stages(stages: Dict[str, Stage], max_workers: int = 4) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    stages: {name: (fn, deps)}. Κάθε fn παίρνει τα results των deps ως kwargs.
+    Ένα stage ξεκινά μόλις τελειώσουν τα deps του, οπότε το wall clock = critical path.
+    Returns (results, timings_ms) — το timings έχει και "total".
+    """
+    results: Dict[str, Any] = {}
+    timings: Dict[str, float] = {}
+    pending = dict(stages)
+    running = {}
+    ctx = metrics.get_context()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name in [n for n, (_, deps) in pending.items() if all(d in results for d in deps)]:
+                fn, deps = pending.pop(name)
+                running[pool.submit(_timed, fn, {d: results[d] for d in deps}, ctx)] = name
+            if not running:
+                raise ValueError(f"Unresolvable stage dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name], timings[name] = fut.result()
+    timings["total"] = (time.perf_counter() - t0) * 1000
+    return results, timings
+
+
+def run_reply_pipeline(
+    client: OpenAI,
+    model: str,
+    review_text: str,
+    platform: str,
+    tone: str,
+    length: str,
+    language_mode: str = "Auto (detect)",
+    property_profile: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    language (local detector) ∥ analysis (fused LLM call) → prompt.
+    Returns {"language", "analysis", "system", "prompt", "timings"}; η generation μένει στον caller
+    (generate_text(..., result["prompt"], system=result["system"])).
+    """
+    def language_stage() -> Tuple[str, float]:
+        if language_mode != "Auto (detect)":
+            return language_mode, 1.0
+        return lang_detect.detect(review_text)
+
+    def analysis_stage() -> Dict[str, Any]:
+        return analyze_review_fused(client, model, review_text)
+
+    def prompt_stage(language: Tuple[str, float], analysis: Dict[str, Any]) -> Dict[str, str]:
+        detected, confidence = language
+        if confidence < lang_detect.MIN_CONFIDENCE:
+            # local detector αβέβαιος → η γλώσσα που έδωσε το fused analysis
+            detected = analysis.get("language", "English")
+        reply_language = "Greek" if detected == "Greek" else "English"
+        prompt = build_reply_prompt(platform, tone, reply_language, length, analysis, review_text, property_profile)
+        return {"language": reply_language, **prompt}
+
+    results, timings = run_stages({
+        "language": (language_stage, ()),
+        "analysis": (analysis_stage, ()),
+        "prompt": (prompt_stage, ("language", "analysis")),
+    })
+    return {
+        "language": results["prompt"]["language"],
+        "analysis": results["analysis"],
+        "system": results["prompt"]["system"],
+        "prompt": results["prompt"]["user"],
+        "timings": timings,
+    }
+
+
+def _reply_messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+    messages = [{"role": "system", "content": system}] if system else []
+    return messages + [{"role": "user", "content": prompt}]
+
+
+# Token usage του τελευταίου call ανά thread (cached_tokens = prompt-prefix cache hits)
+_usage_local = threading.local()
+
+
+def _usage_dict(usage: Any) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0,
+    }
+
+
+def _record_usage(usage: Any) -> None:
+    if usage is not None:
+        _usage_local.last = _usage_dict(usage)
+
+
+def last_usage() -> Optional[Dict[str, int]]:
+    """Usage of the most recent API call made by this thread (None if it was a cache hit / none yet)."""
+    return getattr(_usage_local, "last", None)
+
+
+def generate_text(client: OpenAI, model: str, temperature: float, prompt: str,
+                  system: Optional[str] = None) -> str:
+    _usage_local.last = None
+    messages = _reply_messages(prompt, system)
+    key = cache_key(model, temperature, messages)
+    with metrics.span("llm.generate", model) as sp:
+        if LLM_CACHE_ENABLED:
+            cached = db.llm_cache_get(key)
+            if cached is not None:
+                sp["cache_hit"] = True
+                return cached
+
+        resp = scheduler.chat_create(
+            client,
+            model=model,
+            temperature=temperature,
+            messages=messages,
+        )
+        _record_usage(getattr(resp, "usage", None))
+        sp.update(last_usage() or {})
+    text = resp.choices[0].message.content.strip()
+    if LLM_CACHE_ENABLED:
+        db.llm_cache_put(key, text)
+    return text
+
+
+def generate_candidates(client: OpenAI, model: str, temperature: float, prompt: str, n: int = 3,
+                        system: Optional[str] = None) -> List[str]:
+    """
+    N εναλλακτικά replies από ΕΝΑ completion call (παράμετρος n): το prompt
+    πληρώνεται μία φορά και το latency είναι περίπου όσο ενός reply.
+    """
+    if n <= 1:
+        return [generate_text(client, model, temperature, prompt, system=system)]
+
+    _usage_local.last = None
+    messages = _reply_messages(prompt, system)
+    key = cache_key(model, temperature, messages, n=n)
+    with metrics.span("llm.generate_candidates", model) as sp:
+        if LLM_CACHE_ENABLED:
+            cached = db.llm_cache_get(key)
+            if cached is not None:
+                sp["cache_hit"] = True
+                return json.loads(cached)
+
+        resp = scheduler.chat_create(
+            client,
+            model=model,
+            temperature=temperature,
+            messages=messages,
+            n=n,
+        )
+        _record_usage(getattr(resp, "usage", None))
+        sp.update(last_usage() or {})
+    replies = [c.message.content.strip() for c in sorted(resp.choices, key=lambda c: c.index)]
+    if LLM_CACHE_ENABLED:
+        db.llm_cache_put(key, json.dumps(replies, ensure_ascii=False))
+    return replies
+
+
+def generate_text_stream(client: OpenAI, model: str, temperature: float, prompt: str,
+                         system: Optional[str] = None) -> Iterator[str]:
+    """
+    Σαν το generate_text, αλλά κάνει yield τα tokens όπως έρχονται (stream=True).
+    Μοιράζεται το ίδιο cache key: ένα cached reply γίνεται yield μονομιάς,
+    και το πλήρες reply μπαίνει στο cache όταν τελειώσει το stream.
+    """
+    _usage_local.last = None
+    messages = _reply_messages(prompt, system)
+    key = cache_key(model, temperature, messages)
+    # το span καλύπτει όλο το stream (μέχρι το τελευταίο token), όχι μόνο το πρώτο chunk
+    with metrics.span("llm.generate_stream", model) as sp:
+        if LLM_CACHE_ENABLED:
+            cached = db.llm_cache_get(key)
+            if cached is not None:
+                sp["cache_hit"] = True
+                yield cached
+                return
+
+        stream = scheduler.chat_create(
+            client,
+            model=model,
+            temperature=temperature,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts = []
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                _record_usage(chunk.usage)
+                sp.update(last_usage())
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+
+    text = "".join(parts).strip()
+    if LLM_CACHE_ENABLED and text:
+        db.llm_cache_put(key, text)